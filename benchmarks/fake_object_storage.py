@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for OCI Object Storage, for benchmarking the functions without a tenancy.
+
+Implements the REST endpoints the functions use: namespace, list/get/head/put/delete object,
+multipart upload (create, upload part, commit, abort), copy object with work requests, and
+pre-authenticated request (PAR) uploads including the PAR multipart protocol (opc-multipart).
+Every request can be delayed by a fixed latency, and request/response bodies are throttled to
+a per-connection bandwidth. With max_in_flight, requests beyond that many concurrent ones are
+rejected with 429 TooManyRequests (optionally with Retry-After), like a throttling service.
+Objects are kept in memory; written objects above discard_data_over bytes keep only their size
+and checksum so large benchmark matrices do not exhaust memory.
+
+Requests are not authenticated and PAR tokens are not checked.
+
+Usage:
+    python benchmarks/fake_object_storage.py [--port 8080] [--latency-ms 20] [--bandwidth-mbps 100] [--max-in-flight 8]
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+IO_CHUNK_SIZE = 64 * 1024
+LIST_LIMIT = 1000
+FOCUS_COLUMNS = (
+    'AvailabilityZone', 'BilledCost', 'BillingAccountId', 'BillingCurrency', 'BillingPeriodStart',
+    'BillingPeriodEnd', 'ChargeCategory', 'ChargeDescription', 'ChargePeriodStart', 'ChargePeriodEnd',
+    'EffectiveCost', 'ListCost', 'Region', 'ResourceId', 'ServiceCategory', 'ServiceName',
+    'SubAccountId', 'SubAccountName', 'UsageQuantity', 'UsageUnit', 'oci_CompartmentName'
+)
+FOCUS_SERVICES = (
+    ('Compute', 'COMPUTE', 'OCPU Hours'), ('Storage', 'OBJECT_STORAGE', 'GB Months'),
+    ('Storage', 'BLOCK_STORAGE', 'GB Months'), ('Networking', 'NETWORK', 'GB'),
+    ('Databases', 'DATABASE', 'OCPU Hours'), ('Analytics', 'LOGGING', 'GB')
+)
+FOCUS_REGIONS = ('eu-frankfurt-1', 'us-ashburn-1', 'uk-london-1', 'ap-tokyo-1')
+
+OBJECT_PATH = re.compile(r'^/(?:p/[^/]+/)?n/([^/]+)/b/([^/]+)/o/(.+)$')
+LIST_PATH = re.compile(r'^/n/([^/]+)/b/([^/]+)/o/?$')
+UPLOAD_PATH = re.compile(r'^/n/([^/]+)/b/([^/]+)/u/(.+)$')
+CREATE_UPLOAD_PATH = re.compile(r'^/n/([^/]+)/b/([^/]+)/u/?$')
+PAR_UPLOAD_PATH = re.compile(r'^/p/[^/]+/n/([^/]+)/b/([^/]+)/u/(.+)/id/([^/]+)/(\d*)$')
+COPY_PATH = re.compile(r'^/n/([^/]+)/b/([^/]+)/actions/copyObject$')
+WORK_REQUEST_PATH = re.compile(r'^/workRequests/([^/]+?)(/errors)?$')
+
+
+def generate_focus_report(size, seed=0):
+    """
+    Gzip-compressed FOCUS-like cost report CSV of roughly `size` bytes (at least one block).
+
+    A block of random rows is compressed once and repeated as further gzip members (a valid
+    multi-member .csv.gz), so large reports are cheap to generate.
+    """
+    rng = random.Random(seed)
+    header = ','.join(FOCUS_COLUMNS) + '\n'
+    rows = io.StringIO()
+    for _ in range(2000):
+        category, service, unit = rng.choice(FOCUS_SERVICES)
+        region = rng.choice(FOCUS_REGIONS)
+        compartment = f"compartment-{rng.randint(1, 40)}"
+        quantity = rng.random() * 24
+        cost = quantity * rng.random()
+        rows.write(','.join((
+            f"{region}-AD-{rng.randint(1, 3)}", f"{cost:.6f}", 'ocid1.tenancy.oc1..benchmark', 'EUR',
+            '2026-09-01T00:00Z', '2026-10-01T00:00Z', 'Usage', f"{service} usage",
+            '2026-09-15T00:00Z', '2026-09-15T01:00Z', f"{cost:.6f}", f"{cost * 1.1:.6f}", region,
+            f"ocid1.instance.oc1.{region}.{rng.getrandbits(96):024x}", category, service,
+            'ocid1.compartment.oc1..' + format(rng.getrandbits(64), '016x'), compartment,
+            f"{quantity:.4f}", unit, compartment
+        )) + '\n')
+    block = gzip.compress(rows.getvalue().encode('utf-8'), compresslevel=6)
+    report = io.BytesIO()
+    report.write(gzip.compress(header.encode('utf-8'), compresslevel=6))
+    report.write(block)
+    while report.tell() < size:
+        report.write(block)
+    return report.getvalue()
+
+
+class StoredObject:
+    __slots__ = ('data', 'size', 'md5', 'etag', 'time_created')
+
+    def __init__(self, data, size, md5, keep_data=True):
+        self.data = data if keep_data else None
+        self.size = size
+        self.md5 = md5
+        self.etag = uuid.uuid4().hex
+        self.time_created = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class ObjectStore:
+    """Thread-safe in-memory buckets, multipart uploads and work requests."""
+
+    def __init__(self, discard_data_over=None):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.uploads = {}
+        self.work_requests = {}
+        self.discard_data_over = discard_data_over
+        self.requests = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def put(self, namespace, bucket, name, data, md5=None, written=False):
+        """
+        Store an object; md5 is the base64 digest (computed when not given). Objects written through
+        the API (written=True) above discard_data_over bytes keep only their size and checksum.
+        """
+        md5 = md5 or base64.b64encode(hashlib.md5(data).digest()).decode('utf-8')
+        keep = not written or self.discard_data_over is None or len(data) <= self.discard_data_over
+        stored = StoredObject(data, len(data), md5, keep_data=keep)
+        with self.lock:
+            self.buckets.setdefault((namespace, bucket), {})[name] = stored
+        return stored
+
+    def get(self, namespace, bucket, name):
+        with self.lock:
+            return self.buckets.get((namespace, bucket), {}).get(name)
+
+    def delete(self, namespace, bucket, name):
+        with self.lock:
+            return self.buckets.get((namespace, bucket), {}).pop(name, None) is not None
+
+    def names(self, namespace, bucket):
+        with self.lock:
+            return sorted(self.buckets.get((namespace, bucket), {}))
+
+    def reset(self):
+        with self.lock:
+            self.buckets.clear()
+            self.uploads.clear()
+            self.work_requests.clear()
+            self.requests = self.throttled = self.bytes_in = self.bytes_out = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def store(self):
+        return self.server.store
+
+    # --- transport helpers -------------------------------------------------------------------------
+
+    def _throttle(self, started, sent):
+        bandwidth = self.server.bandwidth
+        if bandwidth:
+            ahead = sent / bandwidth - (time.monotonic() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    def _read_body(self):
+        """Read the request body (Content-Length or chunked) at the configured bandwidth."""
+        started = time.monotonic()
+        body = io.BytesIO()
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                chunk_size = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+                if chunk_size == 0:
+                    self.rfile.readline()
+                    break
+                body.write(self.rfile.read(chunk_size))
+                self.rfile.readline()
+                self._throttle(started, body.tell())
+        else:
+            remaining = int(self.headers.get('Content-Length') or 0)
+            while remaining:
+                chunk = self.rfile.read(min(IO_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                body.write(chunk)
+                remaining -= len(chunk)
+                self._throttle(started, body.tell())
+        with self.store.lock:
+            self.store.bytes_in += body.tell()
+        return body.getvalue()
+
+    def _send(self, status, body=b'', headers=None):
+        try:
+            if isinstance(body, (dict, list, str)):
+                body = json.dumps(body).encode('utf-8')
+                headers = dict({'Content-Type': 'application/json'}, **(headers or {}))
+            self.send_response(status)
+            self.send_header('opc-request-id', uuid.uuid4().hex)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if self.command == 'HEAD' or not body:
+                return
+            started = time.monotonic()
+            view = memoryview(body)
+            for offset in range(0, len(body), IO_CHUNK_SIZE):
+                self.wfile.write(view[offset:offset + IO_CHUNK_SIZE])
+                self._throttle(started, offset + IO_CHUNK_SIZE)
+            with self.store.lock:
+                self.store.bytes_out += len(body)
+        finally:
+            # A request counts as in flight until its response has been written
+            if getattr(self, '_in_flight', False):
+                self._in_flight = False
+                with self.store.lock:
+                    self.store.in_flight -= 1
+
+    def _error(self, status, code, message):
+        self._send(status, {"code": code, "message": message})
+
+    def _content_md5_mismatch(self, body):
+        """Like Object Storage, reject a body that does not match its Content-MD5 header."""
+        content_md5 = self.headers.get('Content-MD5')
+        if content_md5 and content_md5 != base64.b64encode(hashlib.md5(body).digest()).decode('utf-8'):
+            self._error(400, 'InvalidDigest', 'The Content-MD5 you specified did not match what was received')
+            return True
+        return False
+
+    def _route(self):
+        """Request path, or None when the request was rejected with 429 because too many are in flight."""
+        with self.store.lock:
+            self.store.requests += 1
+            throttled = self.server.max_in_flight is not None and self.store.in_flight >= self.server.max_in_flight
+            if throttled:
+                self.store.throttled += 1
+            else:
+                self.store.in_flight += 1
+                self._in_flight = True
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if throttled:
+            # The body is read first so the keep-alive connection stays usable
+            self._read_body()
+            headers = {'Retry-After': str(self.server.retry_after)} if self.server.retry_after is not None else None
+            self._send(429, {"code": "TooManyRequests", "message": "Too many requests for the bucket"}, headers)
+            return None
+        parsed = urllib.parse.urlsplit(self.path)
+        self.query = dict(urllib.parse.parse_qsl(parsed.query, keep_blank_values=True))
+        return parsed.path
+
+    # --- verbs -------------------------------------------------------------------------------------
+
+    def do_GET(self):
+        path = self._route()
+        if path is None:
+            return
+        if path.rstrip('/') == '/n':
+            return self._send(200, json.dumps(self.server.namespace).encode('utf-8'), {'Content-Type': 'application/json'})
+        match = LIST_PATH.match(path)
+        if match:
+            return self._list_objects(*map(urllib.parse.unquote, match.groups()))
+        match = WORK_REQUEST_PATH.match(path)
+        if match:
+            return self._work_request(match.group(1), bool(match.group(2)))
+        match = OBJECT_PATH.match(path)
+        if match:
+            return self._get_object(*map(urllib.parse.unquote, match.groups()))
+        self._error(404, 'NotFound', path)
+
+    do_HEAD = do_GET
+
+    def do_PUT(self):
+        path = self._route()
+        if path is None:
+            return
+        match = PAR_UPLOAD_PATH.match(path)
+        if match:
+            return self._upload_part(match.group(4), int(match.group(5)))
+        match = UPLOAD_PATH.match(path)
+        if match and 'uploadId' in self.query:
+            return self._upload_part(self.query['uploadId'], int(self.query['uploadPartNum']))
+        match = OBJECT_PATH.match(path)
+        if match:
+            namespace, bucket, name = map(urllib.parse.unquote, match.groups())
+            if self.headers.get('opc-multipart', '').lower() == 'true':
+                # PAR multipart: the response carries the access URI for parts, commit and abort
+                self._read_body()
+                upload_id = self._create_upload(namespace, bucket, name)
+                par_prefix = path[:path.index('/n/')]
+                quoted = urllib.parse.quote(name, safe='')
+                return self._send(200, {
+                    "accessUri": f"{par_prefix}/n/{namespace}/b/{bucket}/u/{quoted}/id/{upload_id}/",
+                    "uploadId": upload_id, "objectName": name, "bucketName": bucket, "namespace": namespace
+                })
+            return self._put_object(namespace, bucket, name)
+        self._error(404, 'NotFound', path)
+
+    def do_POST(self):
+        path = self._route()
+        if path is None:
+            return
+        match = PAR_UPLOAD_PATH.match(path)
+        if match:
+            self._read_body()
+            return self._commit_upload(match.group(4))
+        match = CREATE_UPLOAD_PATH.match(path)
+        if match:
+            namespace, bucket = map(urllib.parse.unquote, match.groups())
+            details = json.loads(self._read_body() or b'{}')
+            upload_id = self._create_upload(namespace, bucket, details["object"])
+            return self._send(200, {"namespace": namespace, "bucket": bucket, "object": details["object"],
+                                    "uploadId": upload_id, "timeCreated": StoredObject(b'', 0, '').time_created})
+        match = UPLOAD_PATH.match(path)
+        if match and 'uploadId' in self.query:
+            details = json.loads(self._read_body() or b'{}')
+            return self._commit_upload(self.query['uploadId'], [p["partNum"] for p in details.get("partsToCommit", [])])
+        match = COPY_PATH.match(path)
+        if match:
+            return self._copy_object(*map(urllib.parse.unquote, match.groups()))
+        self._error(404, 'NotFound', path)
+
+    def do_DELETE(self):
+        path = self._route()
+        if path is None:
+            return
+        match = PAR_UPLOAD_PATH.match(path)
+        if match:
+            with self.store.lock:
+                self.store.uploads.pop(match.group(4), None)
+            return self._send(204)
+        match = UPLOAD_PATH.match(path)
+        if match and 'uploadId' in self.query:
+            with self.store.lock:
+                self.store.uploads.pop(self.query['uploadId'], None)
+            return self._send(204)
+        match = OBJECT_PATH.match(path)
+        if match:
+            if self.store.delete(*map(urllib.parse.unquote, match.groups())):
+                return self._send(204)
+            return self._error(404, 'ObjectNotFound', 'The object does not exist')
+        self._error(404, 'NotFound', path)
+
+    # --- operations --------------------------------------------------------------------------------
+
+    def _list_objects(self, namespace, bucket):
+        prefix = self.query.get('prefix', '')
+        start = self.query.get('start')
+        start_after = self.query.get('startAfter')
+        limit = min(int(self.query.get('limit') or LIST_LIMIT), LIST_LIMIT)
+        fields = set((self.query.get('fields') or 'name').split(','))
+        names = [n for n in self.store.names(namespace, bucket)
+                 if n.startswith(prefix) and (start is None or n >= start) and (start_after is None or n > start_after)]
+        objects = []
+        for name in names[:limit]:
+            stored = self.store.get(namespace, bucket, name)
+            if stored is None:
+                continue
+            summary = {"name": name}
+            if 'size' in fields:
+                summary["size"] = stored.size
+            if 'md5' in fields:
+                summary["md5"] = stored.md5
+            if 'etag' in fields:
+                summary["etag"] = stored.etag
+            if 'timeCreated' in fields:
+                summary["timeCreated"] = stored.time_created
+            objects.append(summary)
+        result = {"objects": objects, "prefixes": []}
+        if len(names) > limit:
+            result["nextStartWith"] = names[limit]
+        self._send(200, result)
+
+    def _get_object(self, namespace, bucket, name):
+        stored = self.store.get(namespace, bucket, name)
+        if stored is None:
+            return self._error(404, 'ObjectNotFound', 'The object does not exist')
+        if stored.data is None:
+            return self._error(404, 'ObjectNotFound', 'Object data was discarded by the benchmark store')
+        headers = {'ETag': stored.etag, 'opc-content-md5': stored.md5, 'Content-Type': 'application/octet-stream'}
+        byte_range = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if byte_range:
+            first = int(byte_range.group(1))
+            last = int(byte_range.group(2)) if byte_range.group(2) else stored.size - 1
+            last = min(last, stored.size - 1)
+            headers['Content-Range'] = f"bytes {first}-{last}/{stored.size}"
+            return self._send(206, stored.data[first:last + 1], headers)
+        self._send(200, stored.data, headers)
+
+    def _put_object(self, namespace, bucket, name):
+        body = self._read_body()
+        if self._content_md5_mismatch(body):
+            return
+        current = self.store.get(namespace, bucket, name)
+        if_match = self.headers.get('If-Match')
+        if_none_match = self.headers.get('If-None-Match')
+        if (if_match and (current is None or current.etag != if_match)) or (if_none_match == '*' and current is not None):
+            return self._error(412, 'PreconditionFailed', 'The precondition did not hold')
+        stored = self.store.put(namespace, bucket, name, body, written=True)
+        self._send(200, headers={'ETag': stored.etag, 'opc-content-md5': stored.md5})
+
+    def _create_upload(self, namespace, bucket, name):
+        upload_id = uuid.uuid4().hex
+        with self.store.lock:
+            self.store.uploads[upload_id] = {"target": (namespace, bucket, name), "parts": {}}
+        return upload_id
+
+    def _upload_part(self, upload_id, part_num):
+        body = self._read_body()
+        if self._content_md5_mismatch(body):
+            return
+        with self.store.lock:
+            upload = self.store.uploads.get(upload_id)
+            if upload is not None:
+                upload["parts"][part_num] = body
+        if upload is None:
+            return self._error(404, 'NoSuchUpload', 'The upload does not exist')
+        self._send(200, headers={'ETag': hashlib.md5(body).hexdigest(),
+                                 'opc-content-md5': base64.b64encode(hashlib.md5(body).digest()).decode('utf-8')})
+
+    def _commit_upload(self, upload_id, part_nums=None):
+        with self.store.lock:
+            upload = self.store.uploads.pop(upload_id, None)
+        if upload is None:
+            return self._error(404, 'NoSuchUpload', 'The upload does not exist')
+        part_nums = part_nums or sorted(upload["parts"])
+        data = b''.join(upload["parts"][num] for num in sorted(part_nums))
+        # Like Object Storage, the multipart MD5 is the MD5 of the part MD5s with the part count
+        digest = hashlib.md5(b''.join(hashlib.md5(upload["parts"][num]).digest() for num in sorted(part_nums))).digest()
+        stored = self.store.put(*upload["target"], data, md5=f"{base64.b64encode(digest).decode('utf-8')}-{len(part_nums)}", written=True)
+        self._send(200, headers={'ETag': stored.etag, 'opc-multipart-md5': stored.md5})
+
+    def _copy_object(self, namespace, bucket):
+        details = json.loads(self._read_body() or b'{}')
+        source = self.store.get(namespace, bucket, details["sourceObjectName"])
+        work_request_id = f"ocid1.objectstorageworkrequest.benchmark.{uuid.uuid4().hex}"
+        status = 'FAILED'
+        if source is not None and source.data is not None:
+            self.store.put(details["destinationNamespace"], details["destinationBucket"],
+                           details["destinationObjectName"], source.data, md5=source.md5, written=True)
+            status = 'COMPLETED'
+        with self.store.lock:
+            self.store.work_requests[work_request_id] = status
+        self._send(202, headers={'opc-work-request-id': work_request_id})
+
+    def _work_request(self, work_request_id, errors):
+        with self.store.lock:
+            status = self.store.work_requests.get(work_request_id)
+        if status is None:
+            return self._error(404, 'NotFound', 'The work request does not exist')
+        if errors:
+            return self._send(200, [] if status == 'COMPLETED' else [
+                {"code": "ObjectNotFound", "message": "Source object not found", "timestamp": StoredObject(b'', 0, '').time_created}])
+        self._send(200, {"id": work_request_id, "operationType": "COPY_OBJECT", "status": status, "percentComplete": 100.0})
+
+
+class FakeObjectStorageServer(ThreadingHTTPServer):
+    """
+    Threaded fake Object Storage endpoint. `latency` is seconds added to every request and `bandwidth`
+    the per-connection body rate in bytes/second (None for unlimited). Beyond `max_in_flight` concurrent
+    requests (None for unlimited) requests get 429, with a Retry-After of `retry_after` seconds when set.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, namespace='benchmark', latency=0.0, bandwidth=None, discard_data_over=None,
+                 max_in_flight=None, retry_after=None):
+        super().__init__((host, port), _Handler)
+        self.namespace = namespace
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.store = ObjectStore(discard_data_over=discard_data_over)
+
+    @property
+    def endpoint(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def par_url(self, namespace, bucket):
+        """Bucket-level PAR URL (ending with /o/) for uploads to namespace/bucket."""
+        return f"{self.endpoint}/p/{uuid.uuid4().hex}/n/{namespace}/b/{bucket}/o/"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--namespace', default='benchmark')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='delay added to every request')
+    parser.add_argument('--bandwidth-mbps', type=float, default=0.0, help='per-connection body rate in MB/s (0 = unlimited)')
+    parser.add_argument('--max-in-flight', type=int, default=None, help='reject requests beyond this many concurrent ones with 429')
+    parser.add_argument('--retry-after', type=float, default=None, help='Retry-After seconds sent with 429 responses')
+    args = parser.parse_args()
+    server = FakeObjectStorageServer(args.host, args.port, args.namespace, args.latency_ms / 1000.0,
+                                     args.bandwidth_mbps * 1024 * 1024 or None,
+                                     max_in_flight=args.max_in_flight, retry_after=args.retry_after)
+    print(f"Fake Object Storage listening on {server.endpoint} (namespace '{args.namespace}')")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
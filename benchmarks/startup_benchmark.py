@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the copyusagereport and xtenancycheck functions.
+
+Imports each func.py in a fresh Python interpreter (as the Fn runtime does on a cold start) and
+reports the median/min/max import time, the number of loaded modules and whether the OCI SDK and
+requests were imported. Use --max-ms to fail (exit code 1) when a median exceeds a budget, so
+import-time regressions are caught.
+
+Requires the functions' dependencies (requirements.txt) in the current Python environment.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 15] [--max-ms 400] [--importtime]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTIONS = ('copyusagereport', 'xtenancycheck')
+
+# Runs inside the child interpreter: time the import of one func.py and report loaded modules
+CHILD_SCRIPT = '''
+import importlib.util, json, sys, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("func", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "modules": len(sys.modules),
+    "oci_modules": len([m for m in sys.modules if m == "oci" or m.startswith("oci.")]),
+    "oci_loaded": "oci" in sys.modules,
+    "requests_loaded": "requests" in sys.modules
+}))
+'''
+
+
+def measure(function_name, runs):
+    """Import the function's func.py in `runs` fresh interpreters and summarize the timings."""
+    func_path = os.path.join(REPO_ROOT, function_name, 'func.py')
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT, func_path],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(func_path)
+        )
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    timings_ms = [s["seconds"] * 1000 for s in samples]
+    return {
+        "function": function_name,
+        "runs": runs,
+        "median_ms": round(statistics.median(timings_ms), 1),
+        "min_ms": round(min(timings_ms), 1),
+        "max_ms": round(max(timings_ms), 1),
+        "modules": samples[-1]["modules"],
+        "oci_modules": samples[-1]["oci_modules"],
+        "oci_loaded": samples[-1]["oci_loaded"],
+        "requests_loaded": samples[-1]["requests_loaded"]
+    }
+
+
+def print_importtime(function_name, top):
+    """Print the slowest cumulative imports reported by python -X importtime."""
+    func_path = os.path.join(REPO_ROOT, function_name, 'func.py')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT, func_path],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(func_path)
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # Format: "import time: <self us> | <cumulative us> | <indented module name>"
+        parts = line[len('import time:'):].split('|')
+        rows.append((int(parts[1]), parts[2].rstrip()))
+    print(f"\nSlowest imports for {function_name} (cumulative):")
+    for cumulative_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=15, help='fresh interpreters per function (default 15)')
+    parser.add_argument('--max-ms', type=float, default=None, help='fail when a median import time exceeds this')
+    parser.add_argument('--importtime', action='store_true', help='also print the slowest imports')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = [measure(name, args.runs) for name in FUNCTIONS]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'function':<16} {'median':>9} {'min':>9} {'max':>9} {'modules':>8} {'oci':>5}  requests")
+        for r in results:
+            print(f"{r['function']:<16} {r['median_ms']:>7.1f}ms {r['min_ms']:>7.1f}ms {r['max_ms']:>7.1f}ms "
+                  f"{r['modules']:>8} {r['oci_modules']:>5}  {r['requests_loaded']}")
+    if args.importtime:
+        for name in FUNCTIONS:
+            print_importtime(name, top=15)
+
+    if args.max_ms is not None:
+        over = [r for r in results if r["median_ms"] > args.max_ms]
+        for r in over:
+            print(f"FAIL: {r['function']} median import time {r['median_ms']} ms exceeds {args.max_ms} ms", file=sys.stderr)
+        return 1 if over else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
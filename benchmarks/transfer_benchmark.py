@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Transfer benchmark for the copyusagereport and xtenancycheck functions.
+
+Starts the local fake Object Storage (fake_object_storage.py) with the requested latency and
+bandwidth, fills it with generated FOCUS-like .csv.gz reports and runs the real handler of each
+function over a matrix of file counts x file sizes x transfer modes. Every case runs in a fresh
+interpreter so peak RSS is measured per case; the fake server runs in this process and is not counted.
+
+Reported per case: wall time of the handler call, throughput (copied MB/s), peak RSS of the
+function process, the response status and the number of 429 responses when the fake server throttles
+(--max-in-flight). --save writes the results as JSON and --baseline
+compares a run against such a file, so every performance change can be measured against a baseline.
+
+Requires the functions' dependencies (requirements.txt, or requirements-parquet.txt for Parquet cases) in the current Python environment.
+
+Usage:
+    python benchmarks/transfer_benchmark.py [--files 1,10] [--sizes 1MB,16MB] [--modes staged,stream]
+        [--par] [--latency-ms 20] [--bandwidth-mbps 100] [--max-concurrency 4] [--max-in-flight 6]
+        [--function all|copyusagereport|xtenancycheck] [--config key=value ...]
+        [--save results.json] [--baseline results.json]
+"""
+import argparse
+import base64
+import importlib.util
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_object_storage import FakeObjectStorageServer, generate_focus_report
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORTING_NAMESPACE = 'bling'
+TENANCY_OCID = 'ocid1.tenancy.oc1..benchmark'
+DESTINATION_NAMESPACE = 'benchmark'
+DESTINATION_BUCKET = 'usage-reports'
+REGION = 'eu-frankfurt-1'
+SECRET = 'benchmark-secret'
+LOOK_BACK_DAYS = 3
+HTTP_POOL_SIZE = 64
+# Written objects above this size keep only their checksum in the fake store
+DISCARD_DATA_OVER = 1024 * 1024
+SIZE_UNITS = {'KB': 1024, 'MB': 1024 * 1024, 'GB': 1024 * 1024 * 1024}
+
+
+def parse_size(text):
+    """'512KB', '16MB', '1GB' or a plain number of bytes."""
+    text = text.strip().upper()
+    for unit, factor in SIZE_UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def format_size(size):
+    for unit, factor in sorted(SIZE_UNITS.items(), key=lambda item: -item[1]):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return f"{size}B"
+
+
+# --- child process: runs one handler invocation ----------------------------------------------------
+
+def _benchmark_signer():
+    """
+    Resource Principal signer stand-in: the fake server does not check signatures. It subclasses a
+    self-sufficient SDK signer type so the client accepts it without an API key config.
+    """
+    import oci.auth.signers
+
+    class BenchmarkSigner(oci.auth.signers.SecurityTokenSigner):
+        def __init__(self):
+            self.region = REGION
+            self.tenancy_id = TENANCY_OCID
+
+        def __call__(self, request, *args, **kwargs):
+            return request
+
+        def do_request_sign(self, request, *args, **kwargs):
+            return request
+
+    return BenchmarkSigner()
+
+
+def _load_function(function_name, endpoint):
+    """
+    Import a function's func.py and prime its client cache with a real SDK client that points at the
+    fake endpoint, so the handler runs unchanged without /config or a Resource Principal.
+    """
+    os.environ['OCI_RESOURCE_PRINCIPAL_RPST'] = 'benchmark'
+    func_dir = os.path.join(REPO_ROOT, function_name)
+    sys.path.insert(0, func_dir)
+    spec = importlib.util.spec_from_file_location(f"{function_name}_func", os.path.join(func_dir, 'func.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    import oci.object_storage
+    import oci.retry
+    signer = _benchmark_signer()
+    # Same retry setup as the functions' own clients: retries are left to their transfer controller
+    object_storage = oci.object_storage.ObjectStorageClient({}, signer=signer, service_endpoint=endpoint,
+                                                            retry_strategy=oci.retry.NoneRetryStrategy())
+    session = object_storage.base_client.session
+    session.mount('http://', type(session.adapters['http://'])(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+    module._client_cache['object_storage'] = {
+        "key": ('resource_principal', 'benchmark'),
+        "object_storage": object_storage,
+        "config": {},
+        "signer": signer,
+        "namespace": None
+    }
+    return module
+
+
+def _peak_rss_mb():
+    """
+    Peak RSS of this process. VmHWM is used on Linux because ru_maxrss survives fork/exec and would
+    start at the (larger) RSS of the benchmark parent that holds the fake store.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_child(spec):
+    """Invoke one handler and print a JSON result line (wall time, status, peak RSS)."""
+    from fdk import context
+
+    module = _load_function(spec["function"], spec["endpoint"])
+    deadline = (datetime.now(timezone.utc) + timedelta(seconds=spec["timeout"])).isoformat()
+    ctx = context.InvokeContext('benchmark-app', 'benchmark-app', 'benchmark-fn', spec["function"],
+                                'benchmark-call', deadline=deadline, config=spec["config"])
+    payload = io.BytesIO(json.dumps(spec["payload"]).encode('utf-8') if spec["payload"] is not None else b'')
+    rss_before = _peak_rss_mb()
+    started = time.perf_counter()
+    result = module.handler(ctx, payload)
+    wall_seconds = time.perf_counter() - started
+    body = json.loads(result.response_data)
+    print(json.dumps({
+        "wall_seconds": wall_seconds,
+        "status_code": result.status_code,
+        "peak_rss_mb": _peak_rss_mb(),
+        "import_rss_mb": rss_before,
+        "message": body.get("message"),
+        "metrics": body.get("metrics")
+    }))
+
+
+# --- parent process: fake server, matrix and report ------------------------------------------------
+
+def _report_prefix():
+    report_date = datetime.now() - timedelta(days=LOOK_BACK_DAYS)
+    return f"FOCUS Reports/{report_date.strftime('%Y/%m/%d')}"
+
+
+def _cases(args):
+    functions = ('copyusagereport', 'xtenancycheck') if args.function == 'all' else (args.function,)
+    for function_name in functions:
+        for files in args.files:
+            if function_name == 'copyusagereport':
+                for size in args.sizes:
+                    for mode in args.modes:
+                        yield {"function": function_name, "scenario": mode + ('+par' if args.par else ''), "files": files, "size": size}
+            else:
+                for scenario in ('batch', 'sweep'):
+                    yield {"function": function_name, "scenario": scenario, "files": files, "size": 0}
+
+
+def _prepare(server, case, args, reports):
+    """Fill the fake store for one case and return the child spec."""
+    server.store.reset()
+    secret_prefix = base64.b64encode(SECRET.encode('utf-8')).decode('utf-8') + '_'
+    if case["function"] == 'copyusagereport':
+        if case["size"] not in reports:
+            reports[case["size"]] = generate_focus_report(case["size"])
+        report = reports[case["size"]]
+        for i in range(case["files"]):
+            # The same generated bytes are shared by all source objects of a size
+            server.store.put(REPORTING_NAMESPACE, TENANCY_OCID, f"{_report_prefix()}/{i:06d}.csv.gz", report)
+        config = {
+            "bucket_name": DESTINATION_BUCKET,
+            "days": str(LOOK_BACK_DAYS),
+            "transfer_mode": case["scenario"].split('+')[0],
+            "max_concurrency": str(args.max_concurrency)
+        }
+        if args.par:
+            config.update({"secret": SECRET, "x-tenancy_par": server.par_url(DESTINATION_NAMESPACE, DESTINATION_BUCKET)})
+        config.update(args.config)
+        payload = None
+    else:
+        # Half of the objects lack the secret prefix and are deleted
+        names = [f"{secret_prefix if i % 2 else ''}{i:06d}.csv.gz" for i in range(case["files"])]
+        for name in names:
+            server.store.put(DESTINATION_NAMESPACE, DESTINATION_BUCKET, name, b'0')
+        config = dict({"secret": SECRET, "sweep_concurrency": str(args.max_concurrency)}, **args.config)
+        if case["scenario"] == 'batch':
+            payload = [{"eventType": "com.oraclecloud.objectstorage.createobject",
+                        "data": {"resourceName": name,
+                                 "additionalDetails": {"namespace": DESTINATION_NAMESPACE, "bucketName": DESTINATION_BUCKET}}}
+                       for name in names]
+        else:
+            payload = {"sweep": {"namespace": DESTINATION_NAMESPACE, "bucketName": DESTINATION_BUCKET}}
+    return {"function": case["function"], "endpoint": server.endpoint, "config": config,
+            "payload": payload, "timeout": args.timeout}
+
+
+def run_case(server, case, args, reports):
+    spec = _prepare(server, case, args, reports)
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(spec)],
+                               capture_output=True, text=True, cwd=os.path.join(REPO_ROOT, case["function"]))
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark case {case} failed:\n{completed.stderr[-2000:]}")
+    child = json.loads(completed.stdout.strip().splitlines()[-1])
+    total_bytes = case["files"] * case["size"]
+    return dict(case,
+                wall_seconds=round(child["wall_seconds"], 3),
+                mb_per_s=round(total_bytes / child["wall_seconds"] / (1024 * 1024), 2) if total_bytes else None,
+                objects_per_s=round(case["files"] / child["wall_seconds"], 1),
+                peak_rss_mb=round(child["peak_rss_mb"], 1),
+                import_rss_mb=round(child["import_rss_mb"], 1),
+                status_code=child["status_code"],
+                requests=server.store.requests,
+                throttled=server.store.throttled,
+                message=child["message"])
+
+
+def _case_key(result):
+    return (result["function"], result["scenario"], result["files"], result["size"])
+
+
+def print_results(results, baseline=None):
+    baseline = {_case_key(r): r for r in (baseline or [])}
+    print(f"{'function':<16} {'scenario':<13} {'files':>6} {'size':>6} {'wall':>9} {'MB/s':>8} {'obj/s':>8} "
+          f"{'RSS MB':>7} {'reqs':>6} {'429s':>6} {'status':>6}" + ("  vs baseline (wall / RSS)" if baseline else ""))
+    for r in results:
+        line = (f"{r['function']:<16} {r['scenario']:<13} {r['files']:>6} {format_size(r['size']) if r['size'] else '-':>6} "
+                f"{r['wall_seconds']:>8.3f}s {r['mb_per_s'] if r['mb_per_s'] is not None else '-':>8} "
+                f"{r['objects_per_s']:>8} {r['peak_rss_mb']:>7} {r['requests']:>6} {r.get('throttled', 0):>6} {r['status_code']:>6}")
+        base = baseline.get(_case_key(r))
+        if base:
+            wall_change = (r['wall_seconds'] - base['wall_seconds']) / base['wall_seconds'] * 100 if base['wall_seconds'] else 0.0
+            rss_change = (r['peak_rss_mb'] - base['peak_rss_mb']) / base['peak_rss_mb'] * 100 if base['peak_rss_mb'] else 0.0
+            line += f"  {wall_change:+6.1f}% / {rss_change:+6.1f}%"
+        print(line)
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--child':
+        run_child(json.loads(sys.argv[2]))
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--function', choices=('all', 'copyusagereport', 'xtenancycheck'), default='all')
+    parser.add_argument('--files', default='1,10', help='comma-separated file counts (default 1,10)')
+    parser.add_argument('--sizes', default='1MB,16MB', help='comma-separated report sizes, e.g. 512KB,16MB (default 1MB,16MB)')
+    parser.add_argument('--modes', default='staged,stream', help='copyusagereport transfer modes (default staged,stream)')
+    parser.add_argument('--par', action='store_true', help='upload through a PAR (with secret prefix) instead of the SDK')
+    parser.add_argument('--max-concurrency', type=int, default=4, help='max_concurrency / sweep_concurrency config (default 4)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='latency added to every fake Object Storage request')
+    parser.add_argument('--bandwidth-mbps', type=float, default=0.0, help='per-connection bandwidth in MB/s (0 = unlimited)')
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help='fake server answers 429 beyond this many concurrent requests (default unlimited)')
+    parser.add_argument('--retry-after', type=float, default=None, help='Retry-After seconds sent with those 429 responses')
+    parser.add_argument('--config', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra function config, e.g. multipart_threshold_mb=16 (repeatable)')
+    parser.add_argument('--timeout', type=int, default=300, help='invocation deadline in seconds (default 300)')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare against results saved earlier with --save')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+    args.files = [int(n) for n in args.files.split(',')]
+    args.sizes = [parse_size(s) for s in args.sizes.split(',')]
+    args.modes = [m.strip() for m in args.modes.split(',')]
+    args.config = dict(item.split('=', 1) for item in args.config)
+
+    server = FakeObjectStorageServer(namespace=DESTINATION_NAMESPACE, latency=args.latency_ms / 1000.0,
+                                     bandwidth=args.bandwidth_mbps * 1024 * 1024 or None,
+                                     discard_data_over=DISCARD_DATA_OVER, max_in_flight=args.max_in_flight,
+                                     retry_after=args.retry_after).start()
+    reports = {}
+    results = []
+    try:
+        for case in _cases(args):
+            results.append(run_case(server, case, args, reports))
+            if not args.json:
+                print(f"  {case['function']} {case['scenario']} files={case['files']} "
+                      f"size={format_size(case['size']) if case['size'] else '-'}: {results[-1]['wall_seconds']}s", file=sys.stderr)
+    finally:
+        server.shutdown()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({"settings": {"latency_ms": args.latency_ms, "bandwidth_mbps": args.bandwidth_mbps,
+                                    "max_concurrency": args.max_concurrency, "par": args.par,
+                                    "max_in_flight": args.max_in_flight},
+                       "results": results}, f, indent=2)
+    return 1 if any(r["status_code"] != 200 for r in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,15 +3,2289 @@ import json
 import logging
 import os
 import base64
-import requests
-import oci
-from datetime import datetime, timedelta
+import codecs
+import collections
+import concurrent.futures
+import contextlib
+import csv
+import gzip
+import hashlib
+import heapq
+import itertools
+import operator
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import zlib
+from datetime import datetime, timedelta, timezone
 from fdk import response
 
+# The OCI SDK is imported lazily, as in xtenancycheck: _get_object_storage() loads it on the first
+# invocation and the other functions import the SDK modules they use, already loaded by then. Only the
+# modules used here are imported; older SDK versions otherwise import every service package.
+# requests is imported lazily, only when a PAR upload needs an HTTP session.
+os.environ.setdefault('OCI_PYTHON_SDK_NO_SERVICE_IMPORTS', 'true')
+
 logger = logging.getLogger()
 
+FUNCTION_NAME = 'copyusagereport'
+DEFAULT_MAX_CONCURRENCY = 4
+MAX_CONCURRENCY_LIMIT = 32
+STREAM_CHUNK_SIZE = 1024 * 1024
+TRANSFER_MODES = ('staged', 'stream', 'server')
+DEFAULT_COPY_TIMEOUT = 240
+WORK_REQUEST_POLL_INTERVAL = 2
+WORK_REQUEST_DONE_STATES = ('COMPLETED', 'FAILED', 'CANCELED')
+MANIFEST_OBJECT_NAME = 'copyusagereport_manifest.json'
+MANIFEST_RETENTION_DAYS = 45
+MANIFEST_SAVE_ATTEMPTS = 3
+DEFAULT_MULTIPART_THRESHOLD_MB = 128
+DEFAULT_MULTIPART_PART_SIZE_MB = 32
+DEFAULT_MULTIPART_CONCURRENCY = 4
+HTTP_POOL_SIZE = 64
+MAX_DATE_RANGE_DAYS = 93
+REPORT_PREFIX_ROOT = 'FOCUS Reports'
+DEFAULT_DEADLINE_MARGIN = 15
+TRANSFER_OVERHEAD_SECONDS = 0.5
+COMPLETED_STATUSES = ('copied', 'skipped', 'submitted')
+METRICS_FORMATS = ('prometheus', 'otlp')
+METRICS_EXPORT_TIMEOUT = 5
+TEE_QUEUE_CHUNKS = 4
+DEFAULT_RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 20
+RETRY_AFTER_MAX_DELAY = 60
+THROTTLE_STATUSES = (429, 503)
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+ROLLUP_SUFFIX = '.summary.json'
+ROLLUP_BLOCK_SIZE = 2 * 1024 * 1024
+ROLLUP_MAX_GROUPS = 10000
+ROLLUP_QUEUE_CHUNKS = 4
+# Summary grouping keys and the FOCUS columns they are read from (first column present wins)
+ROLLUP_GROUP_COLUMNS = (
+    ('charge_date', ('ChargePeriodStart',)),
+    ('service', ('ServiceName',)),
+    ('compartment', ('oci_CompartmentName', 'oci_CompartmentId', 'SubAccountName')),
+    ('region', ('RegionName', 'RegionId', 'Region')),
+    ('currency', ('BillingCurrency',))
+)
+ROLLUP_VALUE_COLUMNS = ('BilledCost', 'EffectiveCost', 'ListCost', 'ConsumedQuantity', 'UsageQuantity')
+OUTPUT_FORMATS = ('csv', 'parquet')
+PARQUET_BLOCK_SIZE = 1 * 1024 * 1024
+PARQUET_ROW_GROUP_SIZE = 16 * 1024 * 1024
+PARQUET_COMPRESSION = 'zstd'
+DEFAULT_PARQUET_CONCURRENCY = 1
+PARQUET_MIN_MEMORY_MB = 512  # one conversion peaks at about 230 MB RSS, too close to 256 MB
+# Typed FOCUS columns in Parquet output; all other columns are written as strings
+PARQUET_COLUMN_TYPES = {
+    'BilledCost': 'float64', 'EffectiveCost': 'float64', 'ListCost': 'float64', 'ContractedCost': 'float64',
+    'ListUnitPrice': 'float64', 'ContractedUnitPrice': 'float64',
+    'ConsumedQuantity': 'float64', 'PricingQuantity': 'float64', 'UsageQuantity': 'float64',
+    'BillingPeriodStart': 'timestamp', 'BillingPeriodEnd': 'timestamp',
+    'ChargePeriodStart': 'timestamp', 'ChargePeriodEnd': 'timestamp'
+}
+MAX_WORKERS = 64
+WORKER_INVOKERS = ('fn', 'local')
+WORKER_INVOKE_TIMEOUT = 330
+
+# Signer, client, namespace and HTTP session are cached at module level so warm invocations of the
+# same container skip authentication, client construction and TLS handshakes.
+_client_cache = {}
+_client_cache_lock = threading.Lock()
+
+
+def _get_object_storage():
+    """
+    Return the cached Object Storage client entry, creating it on first use or when the auth source changed.
+    
+    The entry holds 'object_storage', 'config', 'signer' and, once retrieved, 'namespace'. The cache is
+    keyed on the auth source (and the /config file's mtime) so config changes are picked up; a cached
+    Resource Principal signer refreshes its session token when it is about to expire.
+    """
+    import oci.auth.signers
+    import oci.config
+    import oci.object_storage
+    import oci.retry
+    
+    # Check if /config exists (OCI CLI config for local testing)
+    if os.path.exists('/config'):
+        cache_key = ('cli', os.path.getmtime('/config'))
+    else:
+        cache_key = ('resource_principal', os.environ.get('OCI_RESOURCE_PRINCIPAL_RPST'))
+    
+    with _client_cache_lock:
+        cached = _client_cache.get('object_storage')
+        if cached and cached["key"] == cache_key:
+            logger.info("Reusing cached Object Storage client")
+            if cached["signer"] is not None and hasattr(cached["signer"], 'get_security_token'):
+                # Refreshes the session token only when it is no longer valid
+                cached["signer"].get_security_token()
+            return cached
+        
+        if cache_key[0] == 'cli':
+            logger.info("Found /config file, using OCI CLI authentication")
+            config = oci.config.from_file('/config')
+            signer = None
+            object_storage = oci.object_storage.ObjectStorageClient(config, retry_strategy=oci.retry.NoneRetryStrategy())
+        else:
+            logger.info("No /config file found, using Resource Principal authentication")
+            config = {}
+            signer = oci.auth.signers.get_resource_principals_signer()
+            object_storage = oci.object_storage.ObjectStorageClient(config={}, signer=signer, retry_strategy=oci.retry.NoneRetryStrategy())
+        # SDK-level retries are disabled: requests are retried by the transfer controller, which also
+        # adapts concurrency to throttling, so retries are never nested.
+        # Keep enough pooled keep-alive connections for all concurrent transfers, preserving the
+        # SDK's own adapter class (it carries OCI-specific transport behavior)
+        adapter_class = type(object_storage.base_client.session.adapters['https://'])
+        object_storage.base_client.session.mount('https://', adapter_class(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+        
+        cached = {
+            "key": cache_key,
+            "object_storage": object_storage,
+            "config": config,
+            "signer": signer,
+            "namespace": None
+        }
+        _client_cache['object_storage'] = cached
+        return cached
+
+
+def _get_http_session():
+    """Pooled keep-alive requests.Session for PAR uploads, reused across files and warm invocations."""
+    import requests  # deferred: only needed for PAR uploads
+    
+    with _client_cache_lock:
+        session = _client_cache.get('http_session')
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _client_cache['http_session'] = session
+        return session
+
+
+def _report_prefix(report_date):
+    """Daily report prefix: 'FOCUS Reports/YYYY/MM/DD'."""
+    return f"{REPORT_PREFIX_ROOT}/{report_date.year}/{report_date.strftime('%m')}/{report_date.strftime('%d')}"
+
+
+def _report_date_of(source_name):
+    """Report date encoded in a source object name ('FOCUS Reports/YYYY/MM/DD/<file>')."""
+    return datetime.strptime('/'.join(source_name.split('/')[1:4]), '%Y/%m/%d')
+
+
+def _report_dates(cfg, days):
+    """
+    Report dates to copy, oldest first.
+    
+    'start_date'/'end_date' (YYYY-MM-DD, inclusive) select an explicit range; a missing end_date defaults
+    to the usual 'days' look-back date and a missing start_date to end_date. Otherwise 'window_days'
+    selects that many days ending at the look-back date. Without either, only the look-back date is used.
+    """
+    look_back_date = (datetime.now() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    start_date = str(cfg.get('start_date') or '').strip()
+    end_date = str(cfg.get('end_date') or '').strip()
+    if start_date or end_date:
+        try:
+            end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else look_back_date
+            start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else end
+        except ValueError:
+            raise ValueError(f"Invalid 'start_date'/'end_date' ('{start_date}'/'{end_date}'). Use the format YYYY-MM-DD.")
+        if start > end:
+            raise ValueError(f"'start_date' {start_date} is after 'end_date' {end.strftime('%Y-%m-%d')}.")
+        span = (end - start).days + 1
+        if span > MAX_DATE_RANGE_DAYS:
+            raise ValueError(f"Date range of {span} days exceeds the maximum of {MAX_DATE_RANGE_DAYS} days per invocation.")
+    else:
+        try:
+            span = int(cfg.get('window_days', 1))
+        except (TypeError, ValueError):
+            span = 1
+        span = max(1, min(span, MAX_DATE_RANGE_DAYS))  # clamp 1-93
+        start = look_back_date - timedelta(days=span - 1)
+    return [start + timedelta(days=i) for i in range(span)]
+
+
+def _seconds_until_deadline(ctx):
+    """Seconds left until the Fn invocation deadline (Fn-Deadline), or None when it is unknown."""
+    headers = ctx.Headers() if ctx is not None and hasattr(ctx, 'Headers') else None
+    # fdk's Deadline() makes one up (now + 30s) when the header is missing, e.g. for direct handler
+    # calls, so the deadline is only used when Fn actually sent it
+    if not headers or not any(str(k).lower() == 'fn-deadline' for k in headers):
+        return None
+    deadline = ctx.Deadline()
+    if not deadline:
+        return None
+    try:
+        # Fn may send RFC 3339 timestamps with nanoseconds; fromisoformat accepts at most microseconds
+        deadline = str(deadline).replace('Z', '+00:00')
+        if '.' in deadline:
+            head, tail = deadline.split('.', 1)
+            digits = len(tail) - len(tail.lstrip('0123456789'))
+            deadline = f"{head}.{tail[:min(digits, 6)]}{tail[digits:]}"
+        deadline_at = datetime.fromisoformat(deadline)
+    except ValueError:
+        logger.warning(f"Could not parse invocation deadline '{deadline}'")
+        return None
+    return (deadline_at - datetime.now(deadline_at.tzinfo)).total_seconds()
+
+
+def _encode_continuation_token(start_after, report_dates):
+    """Opaque continuation token: where to resume and which date range the run covers."""
+    token = {
+        "v": 1,
+        "start_after": start_after,
+        "start_date": report_dates[0].strftime('%Y-%m-%d'),
+        "end_date": report_dates[-1].strftime('%Y-%m-%d')
+    }
+    return base64.urlsafe_b64encode(json.dumps(token, separators=(',', ':')).encode('utf-8')).decode('utf-8')
+
+
+def _decode_continuation_token(continuation_token):
+    try:
+        token = json.loads(base64.urlsafe_b64decode(continuation_token.encode('utf-8')))
+        if token.get("v") != 1 or not token.get("start_date") or not token.get("end_date"):
+            raise ValueError("unsupported token")
+        return token
+    except Exception:
+        raise ValueError("Invalid 'continuation_token' in request payload.")
+
+
+def _build_object_name(report_date, filename, secret_b64=None):
+    """Destination object name: <YYYY>_<MM>_<DD>_<filename>, optionally prefixed with the base64 secret."""
+    base_object_name = f"{report_date.year}_{report_date.strftime('%m')}_{report_date.strftime('%d')}_{filename}"
+    if secret_b64:
+        return f"{secret_b64}_{base_object_name}"
+    return base_object_name
+
+
+def _parquet_filename(filename):
+    """Report file name with its .csv.gz (or .csv) extension replaced by .parquet."""
+    for extension in ('.csv.gz', '.csv', '.gz'):
+        if filename.endswith(extension):
+            return filename[:-len(extension)] + '.parquet'
+    return filename + '.parquet'
+
+
+def _destination_object_name(source_name, transfer):
+    """Destination object name of a report object, for the transfer's secret prefix and output format."""
+    filename = source_name.rsplit('/', 1)[-1]
+    if transfer["output_format"] == 'parquet':
+        filename = _parquet_filename(filename)
+    return _build_object_name(_report_date_of(source_name), filename, transfer["secret_b64"])
+
+
+def _par_upload_url(x_tenancy_par, object_name):
+    """Resolve the upload URL for a bucket-level PAR (ends with /o/) or an object-level PAR."""
+    # Bucket-level PAR allows writing multiple objects, object-level PAR is for a specific object
+    par_url = x_tenancy_par.rstrip('/')
+    
+    # Check if PAR URL ends with /o/ or /o (bucket-level PAR) or ends with the object name (object-level PAR)
+    if par_url.endswith('/o') or par_url.endswith('/o/'):
+        # Bucket-level PAR - append object name
+        return f"{par_url}/{object_name}"
+    elif par_url.endswith('/' + object_name):
+        # Object-level PAR - use as-is
+        return par_url
+    # Assume bucket-level PAR and append object name
+    return f"{par_url}/{object_name}"
+
+
+class _ChunkStream:
+    """
+    Read-only, non-seekable file-like view over an iterator of byte chunks.
+    
+    Lets a source download be handed directly to put_object or requests.put as a request body
+    with a known Content-Length, so at most one chunk per transfer is held in memory.
+    """
+    
+    def __init__(self, chunks, length):
+        self._chunks = iter(chunks)
+        self._length = length
+        self._buffer = memoryview(b'')
+    
+    def __len__(self):
+        return self._length
+    
+    def __iter__(self):
+        if self._buffer:
+            yield bytes(self._buffer)
+            self._buffer = memoryview(b'')
+        for chunk in self._chunks:
+            yield chunk
+    
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b''.join(self)
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return b''
+            self._buffer = memoryview(chunk)
+        data = bytes(self._buffer[:size])
+        self._buffer = self._buffer[size:]
+        return data
+
+
+def _new_hashers(transfer):
+    """Hashes computed on the chunks of a transfer: MD5 always, SHA-256 when 'checksum_sha256' is enabled."""
+    hashers = {"md5": hashlib.md5(usedforsecurity=False)}
+    if transfer["checksum_sha256"]:
+        hashers["sha256"] = hashlib.sha256()
+    return hashers
+
+
+def _hashed_chunks(chunks, hashers, received=None):
+    """
+    Pass chunks through unchanged while updating the hashers, so checksums cost no extra I/O pass.
+    received["bytes"], when given, counts the bytes actually read, which is what a streamed copy
+    verifies instead of the response's Content-Length.
+    """
+    for chunk in chunks:
+        for hasher in hashers.values():
+            hasher.update(chunk)
+        if received is not None:
+            received["bytes"] += len(chunk)
+        yield chunk
+
+
+def _is_single_part_md5(md5):
+    """Listing MD5s of multipart objects look like '<md5 of part md5s>-<part count>' and cannot be compared."""
+    return bool(md5) and '-' not in md5
+
+
+def _verify_checksums(o, content_length, hashers, result):
+    """
+    Record the computed checksums and compare them with the listing's size and MD5.
+    Raises ValueError on a mismatch, e.g. a truncated download.
+    """
+    md5 = base64.b64encode(hashers["md5"].digest()).decode('utf-8')
+    result["checksums"] = {"md5": md5, "verified": False}
+    if "sha256" in hashers:
+        result["checksums"]["sha256"] = hashers["sha256"].hexdigest()
+    if o.size is not None and content_length != o.size:
+        raise ValueError(f"Size mismatch for '{o.name}': listed {o.size} bytes, read {content_length} bytes")
+    if _is_single_part_md5(o.md5):
+        if md5 != o.md5:
+            raise ValueError(f"MD5 mismatch for '{o.name}': listed {o.md5}, computed {md5}")
+        result["checksums"]["verified"] = True
+    return md5
+
+
+def _tuple_getter(indexes):
+    """operator.itemgetter that always returns a tuple, also for zero or one index."""
+    if len(indexes) > 1:
+        return operator.itemgetter(*indexes)
+    if indexes:
+        index = indexes[0]
+        return lambda row: (row[index],)
+    return lambda row: ()
+
+
+class _FocusRollup:
+    """
+    Streaming rollup of a FOCUS report (.csv.gz or .csv), fed the raw chunks of a copy as they pass through.
+    
+    Gzip members are decompressed a chunk at a time. When pyarrow is installed, the complete CSV records are
+    parsed and grouped with pyarrow.csv in blocks of about ROLLUP_BLOCK_SIZE bytes, else each decompressed
+    chunk is parsed in one csv.reader pass; the cost and usage columns are summed per charge date, service,
+    compartment, region and currency. A block that pyarrow rejects (e.g. a malformed row) is parsed with
+    csv.reader, so both give the same sums. Memory is bounded by two blocks plus ROLLUP_MAX_GROUPS groups;
+    rows of further groups are summed into a single '(other)' group.
+    
+    A report that cannot be parsed never fails its copy: the rollup stops and records the error.
+    """
+    
+    def __init__(self, arrow=None):
+        self.rows = 0
+        self.rows_skipped = 0
+        self.groups = {}
+        self.truncated = False
+        self.error = None
+        self._gzip = None
+        self._decompressor = None
+        self._pending = []  # report bytes after the last complete record
+        self._pending_size = 0
+        self._finished = False
+        self._group_names = []
+        self._value_names = []
+        self._key_of = None
+        self._values_of = None
+        self._arrow = arrow  # (pyarrow, pyarrow.compute, pyarrow.csv), or None for the csv.reader parser
+        self._header = None
+        self._key_columns = []
+    
+    def update(self, chunk):
+        if self.error is not None or not chunk:
+            return
+        try:
+            self._add_bytes(chunk)
+        except Exception as ex:
+            self.error = f"{type(ex).__name__}: {ex}"
+    
+    def finish(self):
+        """Parse what is still buffered; safe to call more than once."""
+        if self._finished or self.error is not None:
+            return
+        self._finished = True
+        try:
+            if self._decompressor is not None:
+                self._add_data(self._decompressor.flush())
+                if not self._decompressor.eof:
+                    raise ValueError("truncated gzip stream")
+            self._add_data(b'', final=True)
+            if self._key_of is None:
+                raise ValueError("report has no header row")
+        except Exception as ex:
+            self.error = f"{type(ex).__name__}: {ex}"
+    
+    def _add_bytes(self, data):
+        if self._gzip is None:
+            self._gzip = data[:2] == b'\x1f\x8b'
+        if not self._gzip:
+            self._add_data(data)
+            return
+        while data:
+            if self._decompressor is None:
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            self._add_data(self._decompressor.decompress(data, STREAM_CHUNK_SIZE))
+            if self._decompressor.eof:
+                # End of one gzip member; reports may consist of several, the next one starts in unused_data
+                data = self._decompressor.unused_data
+                self._decompressor = None
+            else:
+                data = self._decompressor.unconsumed_tail
+    
+    def _add_data(self, data, final=False):
+        """Buffer decompressed report bytes and parse the complete records among them (all of them when final)."""
+        if data:
+            self._pending.append(data)
+            self._pending_size += len(data)
+        elif not final:
+            return
+        if not final and self._arrow is not None and self._pending_size < ROLLUP_BLOCK_SIZE:
+            # pyarrow has a fixed cost per call, so small gzip members or chunks are parsed together
+            return
+        pending = b''.join(self._pending)
+        self._pending = []
+        if not pending:
+            return
+        end = len(pending) - 1 if final else pending.rfind(b'\n')
+        # A newline inside a quoted field is not a record boundary: back off until the quotes are balanced
+        while not final and end >= 0 and pending.count(b'"', 0, end) % 2:
+            end = pending.rfind(b'\n', 0, end)
+        if end < 0 and not final:
+            self._pending, self._pending_size = [pending], len(pending)
+            return
+        rest = pending[end + 1:]
+        self._pending, self._pending_size = [rest], len(rest)
+        start = 0
+        if self._key_of is None:
+            start = self._read_header(pending)
+            if start is None:
+                return
+        if start <= end:
+            # A view, not a copy, of the block: it is the largest buffer a rollup holds
+            self._add_rows(memoryview(pending)[start:end + 1])
+    
+    def _read_header(self, data):
+        """Set the columns from the header, the first line of data; returns the offset of the first record."""
+        start = len(codecs.BOM_UTF8) if data.startswith(codecs.BOM_UTF8) else 0
+        # FOCUS column names never contain line breaks
+        end = data.find(b'\n', start) + 1 or len(data)
+        header = next(csv.reader([data[start:end].decode('utf-8', errors='replace')]), None)
+        if header is None:
+            return None
+        self._set_columns(header)
+        return end
+    
+    def _set_columns(self, header):
+        self._header = [name.strip() for name in header]
+        index = {name: i for i, name in enumerate(self._header)}
+        key_indexes = []
+        for name, candidates in ROLLUP_GROUP_COLUMNS:
+            column = next((c for c in candidates if c in index), None)
+            if column is not None:
+                self._group_names.append(name)
+                self._key_columns.append(column)
+                key_indexes.append(index[column])
+        self._value_names = [c for c in ROLLUP_VALUE_COLUMNS if c in index]
+        if not self._value_names:
+            raise ValueError(f"no cost or usage columns ({', '.join(ROLLUP_VALUE_COLUMNS)}) in the header")
+        self._key_of = _tuple_getter(key_indexes)
+        self._values_of = _tuple_getter([index[c] for c in self._value_names])
+        if len(index) < len(self._header) or not self._key_columns:
+            # Duplicate column names or nothing to group by: csv.reader handles both
+            self._arrow = None
+    
+    def _add_rows(self, block):
+        """Sum a block of complete UTF-8 CSV records, given as a bytes-like object."""
+        if self._arrow is not None:
+            try:
+                self._add_rows_arrow(block)
+                return
+            except self._arrow[0].ArrowException:
+                pass
+        rows = csv.reader(io.StringIO(str(block, 'utf-8', errors='replace')))
+        # Sums per raw key for this block, folded into the groups once per block (one pass per block,
+        # not per row, for the date truncation and the group cap)
+        key_of, values_of = self._key_of, self._values_of
+        batch = {}
+        skipped = 0
+        for row in rows:
+            try:
+                key = key_of(row)
+                try:
+                    values = list(map(float, values_of(row)))
+                except ValueError:
+                    values = [float(v) if v else 0.0 for v in values_of(row)]
+            except (IndexError, ValueError):
+                skipped += bool(row)
+                continue
+            group = batch.get(key)
+            if group is None:
+                batch[key] = [1] + values
+            else:
+                group[0] += 1
+                for i, value in enumerate(values, 1):
+                    group[i] += value
+        self._add_batch(batch)
+        self.rows_skipped += skipped
+    
+    def _add_rows_arrow(self, block):
+        pa, pa_compute, pa_csv = self._arrow
+        column_types = {column: pa.string() for column in self._key_columns}
+        column_types.update({column: pa.float64() for column in self._value_names})
+        table = pa_csv.read_csv(
+            pa.BufferReader(block),
+            read_options=pa_csv.ReadOptions(column_names=self._header, use_threads=False),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            # Only empty values are null (summed as 0.0, like csv.reader); 'NaN' and the like stay floats
+            convert_options=pa_csv.ConvertOptions(include_columns=self._key_columns + self._value_names, column_types=column_types,
+                                                  null_values=[''], strings_can_be_null=False))
+        if self._group_names[0] == 'charge_date':
+            # Group by day before grouping, not per hourly charge period
+            index = table.column_names.index(self._key_columns[0])
+            table = table.set_column(index, self._key_columns[0], pa_compute.utf8_slice_codeunits(table.column(index), 0, 10))
+        grouped = table.group_by(self._key_columns, use_threads=False).aggregate(
+            [(column, 'sum') for column in self._value_names] + [([], 'count_all')])
+        keys = zip(*(grouped.column(column).to_pylist() for column in self._key_columns))
+        counts = grouped.column('count_all').to_pylist()
+        sums = zip(*(grouped.column(f"{column}_sum").to_pylist() for column in self._value_names))
+        self._add_batch({key: [count] + [value or 0.0 for value in values] for key, count, values in zip(keys, counts, sums)})
+    
+    def _add_batch(self, batch):
+        """Fold the per-key sums of one block ({raw key: [rows, sums...]}) into the groups."""
+        date_first = self._group_names[:1] == ['charge_date']
+        for key, group in batch.items():
+            self._add_group(((key[0][:10],) + key[1:]) if date_first else key, group[0], group[1:])
+            self.rows += group[0]
+    
+    def _add_group(self, key, rows, sums):
+        group = self.groups.get(key)
+        if group is None:
+            if len(self.groups) >= ROLLUP_MAX_GROUPS:
+                self.truncated = True
+                key = ('(other)',) * len(key)
+                group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = [0] + [0.0] * len(sums)
+        group[0] += rows
+        for i, value in enumerate(sums, 1):
+            group[i] += value
+    
+    def summary(self, source, report):
+        """The summary object written next to the copied report."""
+        groups = []
+        totals = [0.0] * len(self._value_names)
+        for key, group in sorted(self.groups.items()):
+            entry = dict(zip(self._group_names, key))
+            entry["rows"] = group[0]
+            for i, name in enumerate(self._value_names):
+                entry[name] = round(group[i + 1], 8)
+                totals[i] += group[i + 1]
+            groups.append(entry)
+        return {
+            "source": source,
+            "report": report,
+            "rows": self.rows,
+            "rows_skipped": self.rows_skipped,
+            "group_by": self._group_names,
+            "totals": {name: round(total, 8) for name, total in zip(self._value_names, totals)},
+            "groups_truncated": self.truncated,
+            "groups": groups
+        }
+
+
+def _rollup_arrow():
+    """pyarrow modules for the vectorized rollup parser, or None when pyarrow is not installed."""
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.csv
+    except ImportError:
+        return None
+    return pyarrow, pyarrow.compute, pyarrow.csv
+
+
+def _new_rollup(transfer):
+    """A _FocusRollup for one read of a report when 'rollup' is enabled, else None."""
+    return _FocusRollup(_rollup_arrow()) if transfer["rollup"] else None
+
+
+def _get_rollup_executor():
+    """
+    The thread that runs all rollups, reused across files and warm invocations. One thread keeps the
+    chunks of each rollup in order and pyarrow's allocations in a single per-thread heap.
+    """
+    with _client_cache_lock:
+        executor = _client_cache.get('rollup_executor')
+        if executor is None:
+            executor = _client_cache['rollup_executor'] = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='rollup')
+        return executor
+
+
+def _rollup_chunks(chunks, rollup, metrics):
+    """
+    Pass chunks through unchanged while feeding them to the rollup (if any) on the rollup thread.
+    
+    The reading thread only queues each chunk, so decompressing and parsing run alongside the copy's
+    I/O. At most ROLLUP_QUEUE_CHUNKS chunks per rollup wait to be parsed; a rollup that falls further
+    behind paces its copy. The rollup is finished once the chunks are exhausted.
+    """
+    if rollup is None:
+        return chunks
+    executor = _get_rollup_executor()
+    
+    def update(chunk):
+        started = time.perf_counter()
+        rollup.update(chunk)
+        metrics.add_time("rollup", time.perf_counter() - started)
+    
+    def fed_chunks():
+        queued = collections.deque()
+        try:
+            for chunk in chunks:
+                queued.append(executor.submit(update, chunk))
+                if len(queued) > ROLLUP_QUEUE_CHUNKS:
+                    queued.popleft().result()
+                yield chunk
+            queued.append(executor.submit(rollup.finish))
+        finally:
+            # Also when the copy stops early, so no queued chunk outlives it
+            for future in queued:
+                future.result()
+    
+    return fed_chunks()
+
+
+class _Metrics:
+    """
+    Per-invocation phase timings and counters.
+    
+    Thread-safe and cheap (a perf_counter pair and a short lock per recorded event), so it is always on.
+    Phase times are summed across worker threads and can exceed the wall time of the invocation.
+    """
+    
+    def __init__(self, counters=()):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.phases = {}
+        self.counters = {counter: 0 for counter in counters}
+    
+    @contextlib.contextmanager
+    def timed(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - started)
+    
+    def add_time(self, phase, seconds):
+        with self._lock:
+            entry = self.phases.setdefault(phase, {"seconds": 0.0, "count": 0})
+            entry["seconds"] += seconds
+            entry["count"] += 1
+    
+    def add(self, counter, value=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+    
+    def as_dict(self):
+        with self._lock:
+            wall_seconds = time.perf_counter() - self._started
+            counters = dict(self.counters)
+            phases = {name: {"seconds": round(entry["seconds"], 3), "count": entry["count"]}
+                      for name, entry in self.phases.items()}
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "mb_per_s": round(counters.get("bytes_out", 0) / wall_seconds / (1024 * 1024), 3) if wall_seconds > 0 else 0.0,
+            "phases": phases,
+            "counters": counters
+        }
+
+
+def _prometheus_metrics(metrics, function_name):
+    """Render a metrics snapshot in the Prometheus text exposition format (gauges, one sample per invocation)."""
+    labels = f'function="{function_name}"'
+    lines = [
+        "# TYPE oci_usage_reports_wall_seconds gauge",
+        f"oci_usage_reports_wall_seconds{{{labels}}} {metrics['wall_seconds']}",
+        "# TYPE oci_usage_reports_phase_seconds gauge"
+    ]
+    lines += [f'oci_usage_reports_phase_seconds{{{labels},phase="{name}"}} {entry["seconds"]}'
+              for name, entry in sorted(metrics["phases"].items())]
+    for name, value in sorted(metrics["counters"].items()):
+        lines += [f"# TYPE oci_usage_reports_{name} gauge", f"oci_usage_reports_{name}{{{labels}}} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def _otlp_metrics(metrics, function_name):
+    """Render a metrics snapshot as an OTLP/HTTP JSON ExportMetricsServiceRequest (gauges)."""
+    now = str(time.time_ns())
+    
+    def gauge(name, unit, points):
+        return {"name": name, "unit": unit, "gauge": {"dataPoints": [
+            dict({"timeUnixNano": now, "attributes": [{"key": k, "value": {"stringValue": v}} for k, v in attributes]},
+                 **({"asInt": str(value)} if isinstance(value, int) else {"asDouble": value}))
+            for value, attributes in points
+        ]}}
+    
+    otlp_metrics = [
+        gauge("oci_usage_reports.wall", "s", [(float(metrics["wall_seconds"]), [])]),
+        gauge("oci_usage_reports.phase.duration", "s",
+              [(float(entry["seconds"]), [("phase", name)]) for name, entry in sorted(metrics["phases"].items())])
+    ]
+    otlp_metrics += [gauge(f"oci_usage_reports.{name}", "By" if name.startswith("bytes_") else "1", [(value, [])])
+                     for name, value in sorted(metrics["counters"].items())]
+    return {"resourceMetrics": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": function_name}}]},
+        "scopeMetrics": [{"scope": {"name": "oci_usage_reports"}, "metrics": otlp_metrics}]
+    }]}
+
+
+def _export_metrics(metrics, cfg, function_name):
+    """
+    Optional metrics export: 'metrics_format' ('prometheus' or 'otlp') selects the format and 'metrics_url'
+    (e.g. a Pushgateway job URL or an OTLP/HTTP /v1/metrics endpoint) receives it as a POST.
+    Without a URL the rendered metrics are logged. Export errors never fail the invocation.
+    """
+    metrics_format = str(cfg.get('metrics_format') or '').strip().lower()
+    if not metrics_format:
+        return
+    if metrics_format not in METRICS_FORMATS:
+        logger.warning(f"Ignoring unknown 'metrics_format' '{metrics_format}'. Use one of: {', '.join(METRICS_FORMATS)}.")
+        return
+    if metrics_format == 'prometheus':
+        body, content_type = _prometheus_metrics(metrics, function_name), 'text/plain; version=0.0.4'
+    else:
+        body, content_type = json.dumps(_otlp_metrics(metrics, function_name)), 'application/json'
+    metrics_url = str(cfg.get('metrics_url') or '').strip()
+    if not metrics_url:
+        logger.info(f"Metrics ({metrics_format}):\n{body}")
+        return
+    # Imported here: only needed when metrics are exported, and it is slow to import
+    import urllib.request
+    try:
+        request = urllib.request.Request(metrics_url, data=body.encode('utf-8'), headers={'Content-Type': content_type}, method='POST')
+        with urllib.request.urlopen(request, timeout=METRICS_EXPORT_TIMEOUT) as export_response:
+            export_response.read()
+    except Exception as ex:
+        logger.warning(f"Could not export metrics to '{metrics_url}': {str(ex)}")
+
+
+def _respond(ctx, body, status_code, metrics, cfg):
+    """Attach the invocation metrics to the response, log them as one structured record and export them."""
+    body["metrics"] = metrics.as_dict()
+    logger.info(json.dumps({"event": "invocation_metrics", "function": FUNCTION_NAME, "status_code": status_code, **body["metrics"]}))
+    _export_metrics(body["metrics"], cfg, FUNCTION_NAME)
+    return response.Response(ctx, response_data=json.dumps(body), status_code=status_code)
+
+
+def _retry_after_seconds(headers):
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP date), or None."""
+    value = next((v for k, v in (headers or {}).items() if k.lower() == 'retry-after'), None)
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    import email.utils  # deferred: HTTP-date values are rare
+    try:
+        return max(0.0, (email.utils.parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_decision(ex):
+    """
+    Classify a failed request as (retryable, throttled, retry_after). Throttling (429, 503) and other
+    transient server errors, connection failures and broken or stalled response streams are retryable;
+    client errors (404, 412, ...) are not.
+    """
+    import oci.exceptions  # already loaded with the client
+    
+    status, headers = None, None
+    response_obj = getattr(ex, 'response', None)
+    if isinstance(ex, oci.exceptions.ServiceError):
+        status, headers = ex.status, ex.headers
+    elif response_obj is not None and hasattr(response_obj, 'status_code'):
+        # requests.HTTPError raised by raise_for_status() on a PAR request
+        status, headers = response_obj.status_code, response_obj.headers
+    else:
+        transient = (oci.exceptions.RequestException, oci.exceptions.ConnectTimeout, ConnectionError, TimeoutError)
+        requests = sys.modules.get('requests')  # only loaded when PAR uploads are used
+        if requests is not None:
+            transient += (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+        # A source download read chunk by chunk raises urllib3 errors (the SDK's vendored copy in older versions)
+        for module_name in ('urllib3.exceptions', 'oci._vendor.urllib3.exceptions'):
+            urllib3_exceptions = sys.modules.get(module_name)
+            if urllib3_exceptions is not None:
+                transient += (urllib3_exceptions.ProtocolError, urllib3_exceptions.ReadTimeoutError)
+        return isinstance(ex, transient), False, None
+    throttled = status in THROTTLE_STATUSES
+    return throttled or status in RETRYABLE_STATUSES, throttled, _retry_after_seconds(headers)
+
+
+class _TransferController:
+    """
+    Retry and concurrency controller shared by all Object Storage and PAR requests of an invocation.
+    
+    Throttled and transient failures are retried with full-jitter exponential backoff, or after the
+    Retry-After the service asks for (plus jitter, so throttled requests do not return in lockstep).
+    In-flight requests are limited with AIMD: a throttled response halves the number of requests in
+    flight (once per backoff window), each success grows the limit by 1/limit, up to max_concurrency,
+    so large copies and sweeps settle at the highest rate Object Storage accepts.
+    """
+    
+    def __init__(self, max_concurrency, attempts=DEFAULT_RETRY_ATTEMPTS, metrics=None, deadline=None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.attempts = max(1, attempts)
+        self.limit = float(self.max_concurrency)
+        self.min_limit = self.limit
+        self._metrics = metrics
+        self._deadline = deadline
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+    
+    @contextlib.contextmanager
+    def _slot(self):
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+    
+    def _on_success(self):
+        with self._condition:
+            if self.limit < self.max_concurrency:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+                self._condition.notify_all()
+    
+    def _on_throttle(self):
+        with self._condition:
+            now = time.monotonic()
+            # Requests that were already in flight when the service started throttling count only once
+            if now - self._last_decrease < RETRY_BASE_DELAY:
+                return
+            self._last_decrease = now
+            # Halve what was actually in flight (including the throttled request), not a nominal limit
+            self.limit = max(1.0, min(self.limit, self._in_flight + 1) / 2)
+            self.min_limit = min(self.min_limit, self.limit)
+        logger.warning(f"Throttled by Object Storage, concurrency limit reduced to {int(self.limit)}")
+    
+    def call(self, operation, description, attempts=None, gated=True, retry_decision=None):
+        """
+        Run operation() with retries and return its result. The operation must be safe to repeat, i.e.
+        re-open or re-read any body it sends. With gated=False the call does not wait for a slot (for
+        requests fed by a shared stream) but still reports throttling. retry_decision replaces
+        _retry_decision for operations that are only safe to repeat after some failures.
+        """
+        attempts = attempts or self.attempts
+        retry_decision = retry_decision or _retry_decision
+        for attempt in range(1, attempts + 1):
+            try:
+                with self._slot() if gated else contextlib.nullcontext():
+                    result = operation()
+            except Exception as ex:
+                retryable, throttled, retry_after = retry_decision(ex)
+                if throttled:
+                    self._on_throttle()
+                    if self._metrics is not None:
+                        self._metrics.add("throttled")
+                if not retryable or attempt == attempts:
+                    raise
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+                if retry_after is not None:
+                    delay += min(retry_after, RETRY_AFTER_MAX_DELAY)
+                if self._deadline is not None and time.monotonic() + delay >= self._deadline:
+                    raise
+                import oci.exceptions  # already loaded with the client
+                reason = f"{ex.status} {ex.code}" if isinstance(ex, oci.exceptions.ServiceError) else str(ex)
+                logger.warning(f"{description} failed (attempt {attempt}/{attempts}), retrying in {delay:.1f}s: {reason}")
+                if self._metrics is not None:
+                    self._metrics.add("retries")
+                time.sleep(delay)
+            else:
+                self._on_success()
+                return result
+
+
+def _upload_report(body, content_length, object_name, transfer, retry_strategy=None, content_md5=None):
+    """
+    Upload a report body to the destination bucket, or to the cross-tenancy PAR when enabled.
+    With content_md5 (base64) Object Storage rejects the upload unless the received bytes match it.
+    """
+    if transfer["use_cross_tenancy"]:
+        logger.info(f"Uploading via cross-tenancy PAR to object '{object_name}'")
+        # Use PAR URL for cross-tenancy upload
+        # NOTE: PAR must be created at bucket root with write privileges, without prefix (directory)
+        # PAR URL format: https://objectstorage.<region>.oraclecloud.com/p/<par_id>/n/<namespace>/b/<bucket>/o/<object>
+        upload_url = _par_upload_url(transfer["x_tenancy_par"], object_name)
+        
+        logger.info(f"Uploading to PAR URL: {upload_url[:100]}...")
+        logger.info(f"File size: {content_length} bytes")
+        
+        # Upload via PAR using PUT request; the body is streamed, never read into memory as a whole
+        # PAR URLs don't require authentication headers - the URL itself is the authentication
+        headers = {
+            'Content-Type': 'application/octet-stream',
+            'Content-Length': str(content_length)
+        }
+        if content_md5:
+            headers['Content-MD5'] = content_md5
+        par_response = transfer["http"].put(upload_url, data=body, headers=headers)
+        par_response.raise_for_status()
+        logger.info(f"Successfully uploaded via PAR: {object_name} (Status: {par_response.status_code})")
+    else:
+        logger.info(f"Uploading to destination namespace '{transfer['namespace']}', bucket '{transfer['bucket_name']}', object '{object_name}'")
+        kwargs = {"content_length": content_length}
+        if retry_strategy is not None:
+            kwargs["retry_strategy"] = retry_strategy
+        if content_md5:
+            kwargs["content_md5"] = content_md5
+        transfer["object_storage"].put_object(
+            namespace_name=transfer["namespace"],
+            bucket_name=transfer["bucket_name"],
+            object_name=object_name,
+            put_object_body=body,
+            **kwargs
+        )
+        logger.info(f"Successfully uploaded: {object_name}")
+
+
+def _write_rollup(rollup, o, object_name, transfer, result):
+    """
+    Upload the rollup of a copied report next to it as '<object_name>.summary.json'; the name keeps the
+    secret prefix, so xtenancycheck accepts it. A report that could not be parsed or a failed summary
+    upload is recorded in result["rollup"] and does not fail the copy.
+    """
+    metrics = transfer["metrics"]
+    summary_name = object_name + ROLLUP_SUFFIX
+    try:
+        rollup.finish()
+        if rollup.error is not None:
+            raise ValueError(f"Could not roll up '{o.name}': {rollup.error}")
+        body = json.dumps(rollup.summary(o.name, object_name), separators=(',', ':')).encode('utf-8')
+        content_md5 = base64.b64encode(hashlib.md5(body, usedforsecurity=False).digest()).decode('utf-8')
+        with metrics.timed("rollup_upload"):
+            transfer["controller"].call(
+                lambda: _upload_report(io.BytesIO(body), len(body), summary_name, transfer, content_md5=content_md5),
+                f"Upload of '{summary_name}'")
+        result["rollup"] = {"status": "written", "object": summary_name, "rows": rollup.rows, "groups": len(rollup.groups)}
+        metrics.add("rollups_written")
+    except Exception as ex:
+        logger.error(f"Failed to write rollup summary for '{o.name}': {str(ex)}")
+        result["rollup"] = {"status": "failed", "error": str(ex)}
+        metrics.add("rollups_failed")
+
+
+def _is_bucket_level_par(x_tenancy_par):
+    """Bucket-level PARs (ending with /o) can create multipart uploads for any object name."""
+    return x_tenancy_par.rstrip('/').endswith('/o')
+
+
+def _upload_part(o, object_name, upload, part_num, offset, length, transfer):
+    """
+    Upload one part of a multipart upload, reading its byte range straight from the source object.
+    
+    A failed part is retried on its own through the transfer controller, re-reading only its range.
+    The part's MD5 is computed on the streamed chunks and checked against the MD5 Object Storage reports.
+    Returns the part's ETag and MD5 digest.
+    """
+    import oci.retry
+    
+    def upload_part():
+        part_source = transfer["object_storage"].get_object(
+            transfer["reporting_namespace"],
+            transfer["tenancy_ocid"],
+            o.name,
+            range=f"bytes={offset}-{offset + length - 1}"
+        )
+        hasher = hashlib.md5(usedforsecurity=False)
+        body = _ChunkStream(_hashed_chunks(part_source.data.raw.stream(STREAM_CHUNK_SIZE, decode_content=False), {"md5": hasher}), length)
+        if upload["par_access_url"]:
+            part_response = transfer["http"].put(f"{upload['par_access_url']}{part_num}", data=body, headers={'Content-Length': str(length)})
+            part_response.raise_for_status()
+        else:
+            part_response = transfer["object_storage"].upload_part(
+                transfer["namespace"],
+                transfer["bucket_name"],
+                object_name,
+                upload["upload_id"],
+                part_num,
+                body,
+                content_length=length,
+                retry_strategy=oci.retry.NoneRetryStrategy()
+            )
+        part_md5 = base64.b64encode(hasher.digest()).decode('utf-8')
+        received_md5 = part_response.headers.get('opc-content-md5')
+        if received_md5 and received_md5 != part_md5:
+            raise ValueError(f"MD5 mismatch for part {part_num}: sent {part_md5}, received {received_md5}")
+        return part_response.headers.get('etag'), hasher.digest()
+    
+    return transfer["controller"].call(upload_part, f"Part {part_num} of '{object_name}'")
+
+
+def _multipart_copy(o, object_name, transfer):
+    """
+    Copy a large report as a multipart upload with parts uploaded in parallel.
+    
+    Each part reads its own byte range from the source, so no part is staged on disk and peak memory
+    is one chunk per in-flight part. Uses create/upload_part/commit_multipart_upload for the SDK path
+    and the Object Storage PAR multipart protocol (opc-multipart) for bucket-level PARs.
+    Returns the number of parts uploaded and the multipart MD5 ('<md5 of part md5s>-<part count>').
+    """
+    import oci.object_storage
+    import oci.retry
+    
+    part_size = transfer["multipart_part_size"]
+    parts = [(num, offset, min(part_size, o.size - offset))
+             for num, offset in enumerate(range(0, o.size, part_size), start=1)]
+    upload = {"upload_id": None, "par_access_url": None}
+    
+    controller = transfer["controller"]
+    if transfer["use_cross_tenancy"]:
+        def create_par_upload():
+            par_response = transfer["http"].put(
+                _par_upload_url(transfer["x_tenancy_par"], object_name),
+                headers={'opc-multipart': 'true', 'Content-Length': '0'}
+            )
+            par_response.raise_for_status()
+            return par_response.json()
+        multipart = controller.call(create_par_upload, f"Multipart upload of '{object_name}'")
+        parsed_par = urllib.parse.urlparse(transfer["x_tenancy_par"])
+        upload["upload_id"] = multipart["uploadId"]
+        upload["par_access_url"] = f"{parsed_par.scheme}://{parsed_par.netloc}{multipart['accessUri']}"
+    else:
+        upload["upload_id"] = controller.call(lambda: transfer["object_storage"].create_multipart_upload(
+            transfer["namespace"],
+            transfer["bucket_name"],
+            oci.object_storage.models.CreateMultipartUploadDetails(object=object_name)
+        ), f"Multipart upload of '{object_name}'").data.upload_id
+    logger.info(f"Started multipart upload of '{object_name}': {len(parts)} part(s) of up to {part_size} bytes")
+    
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=transfer["multipart_concurrency"]) as part_executor:
+            uploaded = list(part_executor.map(
+                lambda part: _upload_part(o, object_name, upload, part[0], part[1], part[2], transfer),
+                parts
+            ))
+        etags = [etag for etag, _ in uploaded]
+        multipart_md5 = hashlib.md5(b''.join(digest for _, digest in uploaded), usedforsecurity=False).digest()
+        multipart_md5 = f"{base64.b64encode(multipart_md5).decode('utf-8')}-{len(parts)}"
+        def commit():
+            if upload["par_access_url"]:
+                commit_response = transfer["http"].post(upload["par_access_url"])
+                commit_response.raise_for_status()
+                return commit_response
+            return transfer["object_storage"].commit_multipart_upload(
+                transfer["namespace"],
+                transfer["bucket_name"],
+                object_name,
+                upload["upload_id"],
+                oci.object_storage.models.CommitMultipartUploadDetails(parts_to_commit=[
+                    oci.object_storage.models.CommitMultipartUploadPartDetails(part_num=part[0], etag=etag)
+                    for part, etag in zip(parts, etags)
+                ])
+            )
+        commit_response = controller.call(commit, f"Commit of multipart upload '{object_name}'")
+    except Exception:
+        logger.warning(f"Aborting multipart upload of '{object_name}'")
+        try:
+            if upload["par_access_url"]:
+                transfer["http"].delete(upload["par_access_url"])
+            else:
+                transfer["object_storage"].abort_multipart_upload(
+                    transfer["namespace"], transfer["bucket_name"], object_name, upload["upload_id"])
+        except Exception as abort_ex:
+            logger.error(f"Failed to abort multipart upload of '{object_name}': {str(abort_ex)}")
+        raise
+    committed_md5 = commit_response.headers.get('opc-multipart-md5')
+    if committed_md5 and committed_md5 != multipart_md5:
+        raise ValueError(f"Multipart MD5 mismatch for '{object_name}': sent {multipart_md5}, committed {committed_md5}")
+    logger.info(f"Successfully uploaded (multipart): {object_name}")
+    return len(parts), multipart_md5
+
+
+def _download_report(o, local_file_path, transfer):
+    """
+    Download a report object to local_file_path, retried through the transfer controller (each attempt
+    rewrites the file). Returns the hashers computed on the downloaded chunks and the rollup (or None).
+    """
+    metrics = transfer["metrics"]
+    
+    def download():
+        with metrics.timed("get_object"):
+            object_details = transfer["object_storage"].get_object(transfer["reporting_namespace"], transfer["tenancy_ocid"], o.name)
+        hashers = _new_hashers(transfer)
+        rollup = _new_rollup(transfer)
+        chunks = _hashed_chunks(object_details.data.raw.stream(STREAM_CHUNK_SIZE, decode_content=False), hashers)
+        with metrics.timed("download"), open(local_file_path, 'wb') as f:
+            for chunk in _rollup_chunks(chunks, rollup, metrics):
+                f.write(chunk)
+        return hashers, rollup
+    
+    return transfer["controller"].call(download, f"Download of '{o.name}'")
+
+
+def _upload_report_file(local_file_path, content_length, object_name, transfer, content_md5):
+    """Upload a downloaded report from disk, retried through the transfer controller."""
+    def upload():
+        with open(local_file_path, 'rb') as file_content:
+            _upload_report(file_content, content_length, object_name, transfer, content_md5=content_md5)
+    
+    transfer["controller"].call(upload, f"Upload of '{object_name}'")
+
+
+def _import_pyarrow():
+    """pyarrow is needed only for output_format 'parquet', so it is imported on first use, not on cold start."""
+    try:
+        import pyarrow
+        import pyarrow.csv
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Config key 'output_format' 'parquet' needs the pyarrow package; deploy the function with requirements-parquet.txt as requirements.txt.")
+    return pyarrow, pyarrow.csv, pyarrow.parquet
+
+
+def _get_parquet_executor(parquet_concurrency):
+    """
+    Threads that run all Parquet conversions, reused across files and warm invocations. Converting on
+    a fixed set of threads bounds the conversions running at once, and keeps pyarrow's allocations in
+    the same per-thread heaps instead of leaving freed memory behind in every copy thread.
+    """
+    with _client_cache_lock:
+        cached = _client_cache.get('parquet_executor')
+        if cached is None or cached[0] != parquet_concurrency:
+            if cached is not None:
+                cached[1].shutdown(wait=False)
+            cached = (parquet_concurrency, concurrent.futures.ThreadPoolExecutor(max_workers=parquet_concurrency, thread_name_prefix='parquet'))
+            _client_cache['parquet_executor'] = cached
+        return cached[1]
+
+
+def _convert_to_parquet(source, parquet_path):
+    """
+    Convert a gzipped FOCUS CSV read from the file-like `source` into a Parquet file at parquet_path.
+    
+    The CSV is decompressed and parsed in blocks of PARQUET_BLOCK_SIZE bytes and written as row groups of
+    about PARQUET_ROW_GROUP_SIZE bytes (in memory) with column statistics, so memory stays at one row group
+    plus a few read-ahead blocks whatever the report size. Columns in PARQUET_COLUMN_TYPES are typed, all others are strings.
+    Returns the rows and row groups written.
+    """
+    pa, pa_csv, pa_parquet = _import_pyarrow()
+    types = {"float64": pa.float64(), "timestamp": pa.timestamp('ms', tz='UTC')}
+    with gzip.GzipFile(fileobj=source, mode='rb') as text:
+        # Column names are needed up front: untyped columns are read as strings instead of being inferred
+        # from the first block, which fails when a later block does not match
+        header = text.peek(1).split(b'\n', 1)
+        if len(header) < 2:
+            raise ValueError("No header row at the start of the report")
+        names = next(csv.reader([header[0].decode('utf-8-sig').rstrip('\r')]))
+        reader = pa_csv.open_csv(
+            pa.PythonFile(text, mode='r'),
+            read_options=pa_csv.ReadOptions(block_size=PARQUET_BLOCK_SIZE),
+            convert_options=pa_csv.ConvertOptions(column_types={
+                name: types[PARQUET_COLUMN_TYPES[name]] if name in PARQUET_COLUMN_TYPES else pa.string()
+                for name in names
+            })
+        )
+        rows = row_groups = 0
+        pending, pending_bytes = [], 0
+        with pa_parquet.ParquetWriter(parquet_path, reader.schema, compression=PARQUET_COMPRESSION, write_statistics=True) as writer:
+            # A trailing None flushes the last, partial row group
+            for batch in itertools.chain(reader, [None]):
+                if batch is not None:
+                    pending.append(batch)
+                    pending_bytes += batch.nbytes
+                    if pending_bytes < PARQUET_ROW_GROUP_SIZE:
+                        continue
+                if pending:
+                    table = pa.Table.from_batches(pending, schema=reader.schema)
+                    writer.write_table(table, row_group_size=table.num_rows)
+                    rows += table.num_rows
+                    row_groups += 1
+                    pending, pending_bytes = [], 0
+    return {"rows": rows, "row_groups": row_groups}
+
+
+def _stage_parquet(o, transfer, verified):
+    """
+    Read a report object and convert it to a Parquet temp file in destination_path: 'stream' mode converts
+    straight from the source response, 'staged' mode downloads the report first. The source checksums are
+    verified into `verified` either way ('stream' mode after the conversion has read every chunk).
+    
+    Conversions run on the parquet executor, so at most 'parquet_concurrency' reports are converted at
+    once, whatever max_concurrency is: a conversion holds about 150 MB, so one conversion needs
+    PARQUET_MIN_MEMORY_MB of function memory. In 'staged' mode downloads still run in parallel.
+    
+    Returns the Parquet file path (removed by the caller), the source length, the conversion details
+    (rows, row groups, size and MD5 of the Parquet file) and the rollup (or None).
+    """
+    metrics = transfer["metrics"]
+    filename = o.name.rsplit('/', 1)[-1]
+    fd, parquet_path = tempfile.mkstemp(prefix='report_', suffix='_' + _parquet_filename(filename), dir=transfer["destination_path"])
+    os.close(fd)
+    local_file_path = None
+    try:
+        if transfer["transfer_mode"] == 'stream':
+            # Retried as a whole, like a streaming copy: the source response cannot be rewound
+            def stream_convert():
+                with metrics.timed("get_object"):
+                    object_details = transfer["object_storage"].get_object(transfer["reporting_namespace"], transfer["tenancy_ocid"], o.name)
+                hashers = _new_hashers(transfer)
+                rollup = _new_rollup(transfer)
+                received = {"bytes": 0}
+                chunks = _rollup_chunks(_hashed_chunks(object_details.data.raw.stream(STREAM_CHUNK_SIZE, decode_content=False), hashers, received), rollup, metrics)
+                content_length = int(object_details.headers.get('Content-Length', o.size))
+                logger.info(f"Converting {filename} ({content_length} bytes) to Parquet")
+                with metrics.timed("convert"):
+                    conversion = _convert_to_parquet(_ChunkStream(chunks, content_length), parquet_path)
+                return received["bytes"], hashers, conversion, rollup
+            
+            # The GET is issued on the conversion thread, so a queued conversion does not hold an idle source response
+            content_length, hashers, conversion, rollup = transfer["parquet_executor"].submit(
+                transfer["controller"].call, stream_convert, f"Conversion of '{o.name}'").result()
+            metrics.add("bytes_in", content_length)
+            _verify_checksums(o, content_length, hashers, verified)
+        else:
+            fd, local_file_path = tempfile.mkstemp(prefix='report_', suffix='_' + filename, dir=transfer["destination_path"])
+            os.close(fd)
+            hashers, rollup = _download_report(o, local_file_path, transfer)
+            content_length = os.path.getsize(local_file_path)
+            metrics.add("bytes_in", content_length)
+            _verify_checksums(o, content_length, hashers, verified)
+            logger.info(f"Converting {filename} ({content_length} bytes) to Parquet")
+            
+            def convert_file():
+                with metrics.timed("convert"), open(local_file_path, 'rb') as report:
+                    return _convert_to_parquet(report, parquet_path)
+            
+            conversion = transfer["parquet_executor"].submit(convert_file).result()
+        
+        hasher = hashlib.md5(usedforsecurity=False)
+        with open(parquet_path, 'rb') as parquet_file:
+            for chunk in iter(lambda: parquet_file.read(STREAM_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        conversion["size"] = os.path.getsize(parquet_path)
+        conversion["md5"] = base64.b64encode(hasher.digest()).decode('utf-8')
+    except Exception:
+        os.remove(parquet_path)
+        raise
+    finally:
+        if local_file_path and os.path.exists(local_file_path):
+            os.remove(local_file_path)
+    logger.info(f"Converted {filename}: {conversion['rows']} rows in {conversion['row_groups']} row group(s), {conversion['size']} bytes")
+    return parquet_path, content_length, conversion, rollup
+
+
+def _copy_report_object(o, transfer):
+    """
+    Copy a single report object from the reporting bucket to the destination.
+    
+    Runs on a worker thread. Errors are caught and reported in the returned entry so that
+    one failed file does not abort the rest of the batch.
+    
+    In 'staged' mode the object is downloaded to a temp file and uploaded from disk. In 'stream'
+    mode the source response is piped straight into the upload request, chunk by chunk. Objects at or
+    above the multipart threshold are uploaded in parallel parts in either mode. With output_format
+    'parquet' the report is converted to a Parquet temp file first (see _stage_parquet).
+    
+    Checksums are computed on the same chunks as they pass through and compared with the listing's
+    MD5; uploads carry Content-MD5 so Object Storage rejects corrupted or truncated bodies. With 'rollup'
+    the chunks are also parsed and a summary object is written next to the copy (see _FocusRollup).
+    """
+    import oci.retry
+    
+    filename = o.name.rsplit('/', 1)[-1]
+    object_name = _destination_object_name(o.name, transfer)
+    result = {
+        "source": o.name,
+        "destination": object_name,
+        "size": o.size,
+        "md5": o.md5,
+        "cross_tenancy": transfer["use_cross_tenancy"]
+    }
+    metrics = transfer["metrics"]
+    local_file_path = None
+    rollup = None
+    started = time.perf_counter()
+    try:
+        logger.info(f"Processing object: {o.name}")
+        if transfer["output_format"] == 'csv' and transfer["multipart_threshold"] and o.size and o.size >= transfer["multipart_threshold"] and (
+                not transfer["use_cross_tenancy"] or _is_bucket_level_par(transfer["x_tenancy_par"])):
+            with metrics.timed("multipart"):
+                result["multipart_parts"], multipart_md5 = _multipart_copy(o, object_name, transfer)
+            # The whole-object MD5 is not known for parallel parts; equal only for sources with the same part size
+            result["checksums"] = {"md5": multipart_md5, "verified": multipart_md5 == o.md5}
+            metrics.add("bytes_in", o.size)
+            metrics.add("bytes_out", o.size)
+            result["status"] = "copied"
+            if transfer["rollup"]:
+                # Parts are read as parallel byte ranges; gzip can only be parsed front to back
+                result["rollup"] = {"status": "skipped", "reason": "multipart copy"}
+            return result
+        
+        if transfer["secret_b64"]:
+            logger.info(f"Added secret prefix to filename: {object_name}")
+        
+        if transfer["output_format"] == 'parquet':
+            local_file_path, content_length, result["parquet"], rollup = _stage_parquet(o, transfer, result)
+            with metrics.timed("upload"):
+                _upload_report_file(local_file_path, result["parquet"]["size"], object_name, transfer, result["parquet"]["md5"])
+        elif transfer["transfer_mode"] == 'stream':
+            # The source stream cannot be rewound, so a retry re-reads the source and restarts the upload.
+            # The listing MD5 is known before the first byte, so the destination verifies the streamed body.
+            def stream_copy():
+                with metrics.timed("get_object"):
+                    object_details = transfer["object_storage"].get_object(transfer["reporting_namespace"], transfer["tenancy_ocid"], o.name)
+                hashers = _new_hashers(transfer)
+                rollup = _new_rollup(transfer)
+                received = {"bytes": 0}
+                chunks = _hashed_chunks(object_details.data.raw.stream(STREAM_CHUNK_SIZE, decode_content=False), hashers, received)
+                content_length = int(object_details.headers.get('Content-Length', o.size))
+                logger.info(f"Streaming {filename} ({content_length} bytes) to destination")
+                with metrics.timed("stream"):
+                    _upload_report(_ChunkStream(_rollup_chunks(chunks, rollup, metrics), content_length), content_length, object_name, transfer,
+                                   retry_strategy=oci.retry.NoneRetryStrategy(),
+                                   content_md5=o.md5 if _is_single_part_md5(o.md5) else None)
+                return received["bytes"], hashers, rollup
+            
+            content_length, hashers, rollup = transfer["controller"].call(stream_copy, f"Streaming copy of '{o.name}'")
+            metrics.add("bytes_in", content_length)
+            _verify_checksums(o, content_length, hashers, result)
+        else:
+            # Unique temp file per transfer so concurrent workers never share a path
+            fd, local_file_path = tempfile.mkstemp(prefix='report_', suffix='_' + filename, dir=transfer["destination_path"])
+            os.close(fd)
+            logger.info(f"Downloading to local path: {local_file_path}")
+            hashers, rollup = _download_report(o, local_file_path, transfer)
+            
+            content_length = os.path.getsize(local_file_path)
+            metrics.add("bytes_in", content_length)
+            logger.info(f"Downloaded {filename}, size: {content_length} bytes")
+            # Verified before the upload, so a truncated or corrupted download is never uploaded
+            md5 = _verify_checksums(o, content_length, hashers, result)
+            
+            with metrics.timed("upload"):
+                _upload_report_file(local_file_path, content_length, object_name, transfer, md5)
+        
+        metrics.add("bytes_out", result["parquet"]["size"] if "parquet" in result else content_length)
+        result["size"] = content_length
+        result["status"] = "copied"
+    except Exception as ex:
+        logger.error(f"Failed to copy '{o.name}': {str(ex)}", exc_info=True)
+        result["status"] = "failed"
+        result["error"] = str(ex)
+    finally:
+        if local_file_path and os.path.exists(local_file_path):
+            os.remove(local_file_path)
+        if result.get("status") == "copied":
+            seconds = time.perf_counter() - started
+            result["seconds"] = round(seconds, 3)
+            result["mb_per_s"] = round(result["size"] / seconds / (1024 * 1024), 3) if seconds > 0 and result["size"] else 0.0
+    if rollup is not None and result["status"] == "copied":
+        _write_rollup(rollup, o, object_name, transfer, result)
+    return result
+
+
+def _submit_server_copy(o, transfer):
+    """Submit a server-side copy_object request for one report object; the bytes never pass through the function."""
+    import oci.object_storage
+    
+    object_name = _destination_object_name(o.name, transfer)
+    result = {
+        "source": o.name,
+        "destination": object_name,
+        "size": o.size,
+        "md5": o.md5,
+        "cross_tenancy": False
+    }
+    try:
+        copy_details = oci.object_storage.models.CopyObjectDetails(
+            source_object_name=o.name,
+            destination_region=transfer["region"],
+            destination_namespace=transfer["namespace"],
+            destination_bucket=transfer["bucket_name"],
+            destination_object_name=object_name
+        )
+        with transfer["metrics"].timed("server_submit"):
+            copy_response = transfer["controller"].call(lambda: transfer["object_storage"].copy_object(
+                transfer["reporting_namespace"],
+                transfer["tenancy_ocid"],
+                copy_details
+            ), f"Server-side copy of '{o.name}'")
+        result["work_request_id"] = copy_response.headers.get('opc-work-request-id')
+        result["work_request_status"] = 'ACCEPTED'
+        result["status"] = "submitted"
+        logger.info(f"Submitted server-side copy of '{o.name}' to '{object_name}' (work request: {result['work_request_id']})")
+    except Exception as ex:
+        logger.error(f"Failed to submit server-side copy of '{o.name}': {str(ex)}", exc_info=True)
+        result["status"] = "failed"
+        result["error"] = str(ex)
+    return result
+
+
+def _poll_server_copy(result, transfer):
+    """Refresh the work request status of a submitted server-side copy."""
+    try:
+        work_request = transfer["object_storage"].get_work_request(result["work_request_id"]).data
+        result["work_request_status"] = work_request.status
+        if work_request.status == 'COMPLETED':
+            result["status"] = "copied"
+            logger.info(f"Server-side copy completed: {result['destination']}")
+        elif work_request.status in WORK_REQUEST_DONE_STATES:
+            result["status"] = "failed"
+            errors = transfer["object_storage"].list_work_request_errors(result["work_request_id"]).data
+            result["error"] = "; ".join(e.message for e in errors) if errors else f"Work request {work_request.status}"
+            logger.error(f"Server-side copy of '{result['source']}' {work_request.status}: {result['error']}")
+    except Exception as ex:
+        # Transient polling errors are retried on the next round
+        logger.warning(f"Could not poll work request {result['work_request_id']}: {str(ex)}")
+    return result
+
+
+def _wait_for_server_copies(results, transfer, executor, copy_timeout):
+    """
+    Poll all outstanding server-side copy work requests concurrently until they finish or
+    copy_timeout seconds have passed.
+    
+    Copies still running at the timeout keep status 'submitted'; Object Storage completes them
+    in the background.
+    """
+    deadline = time.monotonic() + copy_timeout
+    pending = [r for r in results if r["status"] == "submitted"]
+    while pending and time.monotonic() < deadline:
+        time.sleep(WORK_REQUEST_POLL_INTERVAL)
+        list(executor.map(lambda r: _poll_server_copy(r, transfer), pending))
+        pending = [r for r in pending if r["status"] == "submitted"]
+    if pending:
+        logger.warning(f"{len(pending)} server-side copy work request(s) still running after {copy_timeout}s")
+    return results
+
+
+def _iter_report_objects(object_storage, namespace, bucket, prefix, start_after=None, controller=None):
+    """
+    Lazily list report objects page by page, so transfers start as soon as the first page arrives
+    instead of after the whole listing. Only the fields needed downstream are requested.
+    With a transfer controller each page request is retried on its own.
+    """
+    import oci.pagination
+    
+    logger.info(f"Listing objects in namespace '{namespace}', bucket '{bucket}', prefix '{prefix}'")
+    kwargs = {"prefix": prefix, "fields": 'name,size,md5,etag'}
+    if start_after:
+        kwargs["start_after"] = start_after
+    list_objects = object_storage.list_objects
+    if controller is not None:
+        list_objects = lambda *args, **list_kwargs: controller.call(
+            lambda: object_storage.list_objects(*args, **list_kwargs), f"Listing of '{prefix}'")
+    return oci.pagination.list_call_get_all_results_generator(
+        list_objects,
+        'record',
+        namespace,
+        bucket,
+        **kwargs
+    )
+
+
+def _iter_report_objects_for_dates(object_storage, namespace, bucket, report_dates, max_concurrency, start_after=None, metrics=None, controller=None):
+    """
+    List the daily prefixes of all report dates concurrently and merge them into one stream of objects.
+    
+    Each prefix is listed by its own thread into its own queue; objects are yielded in date order
+    (oldest first) while later prefixes keep listing in the background. With start_after (from a
+    continuation token) listing resumes after that object name.
+    """
+    if start_after:
+        # Object names sort by date, so whole days before the resume point are skipped
+        report_dates = [d for d in report_dates if _report_prefix(d) >= _report_prefix(_report_date_of(start_after))]
+    done = object()
+    stop = threading.Event()
+    queues = [queue.Queue() for _ in report_dates]
+    
+    def list_prefix(prefix_queue, report_date):
+        started = time.perf_counter()
+        try:
+            prefix = _report_prefix(report_date)
+            for o in _iter_report_objects(object_storage, namespace, bucket, prefix,
+                                          start_after if start_after and start_after.startswith(prefix + '/') else None,
+                                          controller=controller):
+                if stop.is_set():
+                    break
+                prefix_queue.put(o)
+        except Exception as ex:
+            prefix_queue.put(ex)
+        finally:
+            if metrics is not None:
+                metrics.add_time("list", time.perf_counter() - started)
+            prefix_queue.put(done)
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(len(report_dates), max_concurrency))) as listing_executor:
+        for prefix_queue, report_date in zip(queues, report_dates):
+            listing_executor.submit(list_prefix, prefix_queue, report_date)
+        try:
+            for prefix_queue in queues:
+                while True:
+                    item = prefix_queue.get()
+                    if item is done:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        finally:
+            # Stop background listing when the consumer stops early
+            stop.set()
+
+
+def _map_in_order(executor, fn, items, max_in_flight):
+    """
+    Like executor.map, but consumes `items` lazily and keeps at most max_in_flight tasks queued,
+    so a generator (e.g. a paginated listing) overlaps with the work. Results keep the input order.
+    
+    Returns (results, error). When `items` raises (e.g. a listing request fails after its retries),
+    the tasks already submitted still complete and their results are returned with the exception.
+    """
+    slots = threading.BoundedSemaphore(max_in_flight)
+    futures = []
+    error = None
+    try:
+        for item in items:
+            slots.acquire()
+            future = executor.submit(fn, item)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+    except Exception as ex:
+        error = ex
+    return [future.result() for future in futures], error
+
+
+def _process_report_object(o, transfer):
+    """Skip an object already recorded in the manifest; otherwise copy it (or submit a server-side copy)."""
+    skipped = _manifest_skip_entry(o, [transfer])
+    if skipped is not None:
+        logger.info(f"Skipping '{o.name}': already present in the destination")
+        return skipped
+    
+    # Deadline-aware scheduling: do not start a transfer that cannot finish in the remaining time budget
+    if transfer["deadline"] is not None and (transfer["stop"].is_set() or not _can_finish_in_time(o, transfer)):
+        transfer["stop"].set()
+        return {
+            "source": o.name,
+            "destination": None,
+            "size": o.size,
+            "md5": o.md5,
+            "cross_tenancy": transfer["use_cross_tenancy"],
+            "status": "deferred"
+        }
+    
+    if transfer["transfer_mode"] == 'server':
+        return _submit_server_copy(o, transfer)
+    started = time.monotonic()
+    result = _copy_report_object(o, transfer)
+    if result["status"] == "copied" and result["size"]:
+        with transfer["throughput_lock"]:
+            transfer["throughput"]["bytes"] += result["size"]
+            transfer["throughput"]["seconds"] += time.monotonic() - started
+    return result
+
+
+def _can_finish_in_time(o, transfer):
+    """
+    Decide whether to start a transfer, and count it as started if so.
+    
+    The first transfer of an invocation always starts, so every invocation makes progress however large
+    the report. Later transfers are deferred when the per-transfer throughput observed so far in this
+    invocation says they would not finish before the deadline; until a transfer has finished there is
+    no observation, and only the fixed overhead is estimated.
+    """
+    with transfer["throughput_lock"]:
+        observed = transfer["throughput"]
+        estimate = TRANSFER_OVERHEAD_SECONDS
+        if transfer["transfer_mode"] != 'server' and observed["bytes"] > 0:
+            estimate += (o.size or 0) * observed["seconds"] / observed["bytes"]
+        start = observed["started"] == 0 or time.monotonic() + estimate < transfer["deadline"]
+        if start:
+            observed["started"] += 1
+    return start
+
+
+def _parse_destinations(cfg):
+    """
+    Parse the optional 'destinations' config: a JSON list of destination buckets and/or PARs, each with
+    its own secret prefix, e.g. [{"bucket_name": "reports", "secret": "s1"}, {"par": "https://...", "secret": "s2"}].
+    
+    Returns None when not configured; the single bucket_name / x-tenancy_par destination is used then.
+    """
+    raw_destinations = cfg.get('destinations')
+    if not raw_destinations or not str(raw_destinations).strip():
+        return None
+    try:
+        entries = json.loads(raw_destinations)
+    except ValueError:
+        raise ValueError("Invalid config key 'destinations': expected a JSON list of destinations.")
+    if not isinstance(entries, list) or not entries or not all(isinstance(e, dict) for e in entries):
+        raise ValueError("Invalid config key 'destinations': expected a non-empty JSON list of objects.")
+    destinations = []
+    for index, entry in enumerate(entries, start=1):
+        bucket = str(entry.get('bucket_name') or '').strip()
+        par = str(entry.get('par') or '').strip()
+        secret = str(entry.get('secret') or '').strip()
+        if bool(bucket) == bool(par):
+            raise ValueError(f"Invalid config key 'destinations': entry {index} needs exactly one of 'bucket_name' or 'par'.")
+        # Same rule as x-tenancy_par: PAR uploads always carry the secret prefix checked by xtenancycheck
+        if par and not secret:
+            raise ValueError(f"Invalid config key 'destinations': entry {index} uses a 'par' without a 'secret'.")
+        destinations.append({
+            "name": str(entry.get('name') or bucket or f"par-{index}"),
+            "bucket_name": bucket or None,
+            "namespace": str(entry.get('namespace') or '').strip() or None,
+            "x_tenancy_par": par or None,
+            "secret": secret or None
+        })
+    names = [d["name"] for d in destinations]
+    if len(set(names)) != len(names):
+        raise ValueError("Invalid config key 'destinations': destination names must be unique; set 'name' on duplicates.")
+    return destinations
+
+
+def _destination_transfer(transfer, destination):
+    """Per-destination view of the transfer settings; clients, metrics and the stop flag stay shared."""
+    secret = destination["secret"]
+    return dict(
+        transfer,
+        destination_name=destination["name"],
+        bucket_name=destination["bucket_name"],
+        namespace=destination["namespace"] or transfer["namespace"],
+        secret_b64=base64.b64encode(secret.encode('utf-8')).decode('utf-8') if secret else None,
+        use_cross_tenancy=bool(destination["x_tenancy_par"]),
+        x_tenancy_par=destination["x_tenancy_par"]
+    )
+
+
+def _destination_entries(processed_files, index):
+    """Entries of one destination: the per-destination entries of fanned-out files, else the file entries."""
+    return [f["destinations"][index] if "destinations" in f else f for f in processed_files]
+
+
+def _fan_out_status(entries):
+    """Overall status of a fanned-out file: the least complete status of its destinations."""
+    statuses = {e["status"] for e in entries}
+    for status in ("failed", "deferred", "submitted", "copied"):
+        if status in statuses:
+            return status
+    return "skipped"
+
+
+def _fan_out_report_object(o, transfers):
+    """
+    Copy one report object to every configured destination, reading it from the source only once.
+    
+    Returns one entry for the source object with the per-destination entries under "destinations";
+    destinations whose manifest already records the object are skipped.
+    """
+    entries = []
+    targets = []
+    for t in transfers:
+        entry = {
+            "destination_name": t["destination_name"],
+            "source": o.name,
+            "destination": _destination_object_name(o.name, t),
+            "size": o.size,
+            "md5": o.md5,
+            "cross_tenancy": t["use_cross_tenancy"]
+        }
+        manifest = t.get("manifest")
+        if manifest is not None and _manifest_entry_matches(manifest.get(o.name), o, entry["destination"]):
+            entry["status"] = "skipped"
+        else:
+            targets.append((t, entry))
+        entries.append(entry)
+    result = {"source": o.name, "size": o.size, "md5": o.md5, "destinations": entries}
+    if not targets:
+        logger.info(f"Skipping '{o.name}': already present in all destinations")
+        result["status"] = "skipped"
+        return result
+    
+    transfer = transfers[0]
+    if transfer["deadline"] is not None and (transfer["stop"].is_set() or not _can_finish_in_time(o, transfer)):
+        transfer["stop"].set()
+        for _, entry in targets:
+            entry["status"] = "deferred"
+        result["status"] = "deferred"
+        return result
+    
+    if transfer["transfer_mode"] == 'server':
+        for t, entry in targets:
+            entry.update(_submit_server_copy(o, t))
+    else:
+        started = time.monotonic()
+        _tee_copy(o, targets)
+        if any(entry["status"] == "copied" for _, entry in targets) and o.size:
+            with transfer["throughput_lock"]:
+                transfer["throughput"]["bytes"] += o.size
+                transfer["throughput"]["seconds"] += time.monotonic() - started
+    result["status"] = _fan_out_status(entries)
+    return result
+
+
+def _upload_to_destination(target, upload):
+    """Run one destination's upload and record the outcome in its entry; other destinations are unaffected."""
+    t, entry = target
+    try:
+        upload(t, entry)
+        entry["status"] = "copied"
+        entry.pop("error", None)  # from an earlier attempt of a retried stream
+    except Exception as ex:
+        logger.error(f"Failed to copy '{entry['source']}' to destination '{t['destination_name']}': {str(ex)}", exc_info=True)
+        entry["status"] = "failed"
+        entry["error"] = str(ex)
+
+
+def _tee_chunks(chunks, content_length, targets, content_md5):
+    """
+    Stream source chunks to all destinations concurrently.
+    
+    Each destination uploads from its own bounded queue, so at most TEE_QUEUE_CHUNKS chunks per
+    destination are held in memory and the slowest destination paces the download. A destination
+    whose upload ends (e.g. fails) stops receiving chunks; the others carry on.
+    """
+    import oci.retry
+    
+    end = object()
+    queues = [queue.Queue(maxsize=TEE_QUEUE_CHUNKS) for _ in targets]
+    finished = [threading.Event() for _ in targets]
+    
+    def queued_chunks(chunk_queue):
+        while True:
+            item = chunk_queue.get()
+            if item is end:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    
+    def upload(index):
+        try:
+            # One attempt: the shared stream cannot be replayed for a single destination. Not gated, since
+            # a destination waiting for a slot would stall the reader and every other destination.
+            _upload_to_destination(targets[index], lambda t, entry: t["controller"].call(lambda: _upload_report(
+                _ChunkStream(queued_chunks(queues[index]), content_length), content_length, entry["destination"], t,
+                retry_strategy=oci.retry.NoneRetryStrategy(), content_md5=content_md5),
+                f"Upload of '{entry['destination']}'", attempts=1, gated=False))
+        finally:
+            finished[index].set()
+    
+    def offer(index, item):
+        while not finished[index].is_set():
+            try:
+                queues[index].put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        for index in range(len(targets)):
+            executor.submit(upload, index)
+        last_item = end
+        try:
+            for chunk in chunks:
+                for index in range(len(targets)):
+                    offer(index, chunk)
+        except Exception as ex:
+            # A failed source read fails the uploads still in progress instead of leaving them waiting
+            last_item = ex
+            raise
+        finally:
+            for index in range(len(targets)):
+                offer(index, last_item)
+
+
+def _tee_copy(o, targets):
+    """
+    Read one report object once and upload it to several destinations.
+    
+    In 'stream' mode the source chunks are teed to concurrent uploads (see _tee_chunks). In 'staged'
+    mode the object is downloaded to /tmp once and every destination uploads from its own file handle
+    in parallel; with output_format 'parquet' that file is the converted report. Fan-out uploads use
+    one PUT per destination; multipart is not used.
+    
+    Checksums (and the rollup, when enabled) are computed once on the source chunks. Outcomes are recorded
+    in the destination entries.
+    """
+    transfer = targets[0][0]
+    metrics = transfer["metrics"]
+    filename = o.name.rsplit('/', 1)[-1]
+    verified = {}
+    rollup = None
+    conversion = None
+    content_length = o.size
+    local_file_path = None
+    started = time.perf_counter()
+    try:
+        logger.info(f"Processing object: {o.name} for {len(targets)} destination(s)")
+        if transfer["output_format"] == 'parquet':
+            local_file_path, content_length, conversion, rollup = _stage_parquet(o, transfer, verified)
+            upload_length, md5 = conversion["size"], conversion["md5"]
+        elif transfer["transfer_mode"] == 'stream':
+            # A source read that breaks off fails every destination's upload, so the whole tee is retried
+            def tee_stream():
+                with metrics.timed("get_object"):
+                    object_details = transfer["object_storage"].get_object(transfer["reporting_namespace"], transfer["tenancy_ocid"], o.name)
+                hashers = _new_hashers(transfer)
+                rollup = _new_rollup(transfer)
+                received = {"bytes": 0}
+                chunks = _rollup_chunks(_hashed_chunks(object_details.data.raw.stream(STREAM_CHUNK_SIZE, decode_content=False), hashers, received), rollup, metrics)
+                content_length = int(object_details.headers.get('Content-Length', o.size))
+                logger.info(f"Streaming {filename} ({content_length} bytes) to {len(targets)} destination(s)")
+                with metrics.timed("stream"):
+                    _tee_chunks(chunks, content_length, targets, o.md5 if _is_single_part_md5(o.md5) else None)
+                return received["bytes"], hashers, rollup
+            
+            content_length, hashers, rollup = transfer["controller"].call(tee_stream, f"Streaming copy of '{o.name}'")
+            metrics.add("bytes_in", content_length)
+            _verify_checksums(o, content_length, hashers, verified)
+        else:
+            fd, local_file_path = tempfile.mkstemp(prefix='report_', suffix='_' + filename, dir=transfer["destination_path"])
+            os.close(fd)
+            hashers, rollup = _download_report(o, local_file_path, transfer)
+            content_length = os.path.getsize(local_file_path)
+            metrics.add("bytes_in", content_length)
+            logger.info(f"Downloaded {filename}, size: {content_length} bytes")
+            md5 = _verify_checksums(o, content_length, hashers, verified)
+            upload_length = content_length
+        
+        if local_file_path:
+            def upload_file(t, entry):
+                _upload_report_file(local_file_path, upload_length, entry["destination"], t, md5)
+            
+            with metrics.timed("upload"), concurrent.futures.ThreadPoolExecutor(max_workers=len(targets)) as executor:
+                list(executor.map(lambda target: _upload_to_destination(target, upload_file), targets))
+    except Exception as ex:
+        # Source-side failure (read or checksum): no destination holds a verified copy
+        logger.error(f"Failed to copy '{o.name}': {str(ex)}", exc_info=True)
+        for _, entry in targets:
+            if entry.get("status") != "failed":
+                entry["status"] = "failed"
+                entry["error"] = str(ex)
+    finally:
+        if local_file_path and os.path.exists(local_file_path):
+            os.remove(local_file_path)
+    
+    seconds = time.perf_counter() - started
+    for t, entry in targets:
+        if entry["status"] == "copied":
+            metrics.add("bytes_out", conversion["size"] if conversion else content_length)
+            entry["size"] = content_length
+            entry["checksums"] = dict(verified["checksums"])
+            if conversion:
+                entry["parquet"] = dict(conversion)
+            entry["seconds"] = round(seconds, 3)
+            entry["mb_per_s"] = round(content_length / seconds / (1024 * 1024), 3) if seconds > 0 and content_length else 0.0
+            if rollup is not None:
+                _write_rollup(rollup, o, entry["destination"], t, entry)
+
+
+def _manifest_skip_entry(o, transfers):
+    """The 'skipped' entry of an object that the manifest of every destination already records, else None."""
+    entries = []
+    for t in transfers:
+        manifest = t.get("manifest")
+        object_name = _destination_object_name(o.name, t)
+        if manifest is None or not _manifest_entry_matches(manifest.get(o.name), o, object_name):
+            return None
+        entries.append({
+            "destination_name": t.get("destination_name"),
+            "source": o.name,
+            "destination": object_name,
+            "size": o.size,
+            "md5": o.md5,
+            "cross_tenancy": t["use_cross_tenancy"],
+            "status": "skipped"
+        })
+    if len(entries) == 1:
+        del entries[0]["destination_name"]
+        return entries[0]
+    return {"source": o.name, "size": o.size, "md5": o.md5, "destinations": entries, "status": "skipped"}
+
+
+def _size_balanced_shards(objects, shard_count):
+    """
+    Split objects into at most shard_count shards of similar total size: largest first, each into the
+    currently smallest shard. Each shard keeps the listing order.
+    """
+    shards = [(0, index, []) for index in range(min(shard_count, len(objects)))]
+    for position, o in sorted(enumerate(objects), key=lambda item: -(item[1].size or 0)):
+        total, index, shard = heapq.heappop(shards)
+        shard.append((position, o))
+        heapq.heappush(shards, (total + (o.size or 0), index, shard))
+    return [[o for _, o in sorted(shard, key=lambda item: item[0])] for _, _, shard in sorted(shards, key=lambda item: item[1])]
+
+
+class _FnInvoker:
+    """
+    Dispatches worker shards as synchronous invocations of an Oracle Function (by default this same
+    function) through the Functions invoke API.
+    """
+    
+    def __init__(self, clients, function_id, invoke_endpoint, controller):
+        import oci.functions  # deferred: only coordinators invoke functions
+        kwargs = {"signer": clients["signer"]} if clients["signer"] is not None else {}
+        if not invoke_endpoint:
+            management = oci.functions.FunctionsManagementClient(clients["config"], retry_strategy=oci.retry.NoneRetryStrategy(), **kwargs)
+            invoke_endpoint = controller.call(lambda: management.get_function(function_id).data.invoke_endpoint, "Worker function lookup")
+        self._function_id = function_id
+        self._client = oci.functions.FunctionsInvokeClient(
+            clients["config"], service_endpoint=invoke_endpoint, timeout=(10, WORKER_INVOKE_TIMEOUT),
+            retry_strategy=oci.retry.NoneRetryStrategy(), **kwargs)
+    
+    def __call__(self, payload):
+        invoked = self._client.invoke_function(
+            self._function_id,
+            invoke_function_body=json.dumps(payload),
+            fn_intent='httprequest',
+            fn_invoke_type='sync'
+        )
+        return {"status_code": invoked.status, "body": json.loads(invoked.data.text)}
+
+
+def _run_local_worker(cfg, payload):
+    """Body of a local worker process: invoke the handler as a worker invocation would and return its response."""
+    from fdk import context
+    # Without an Fn-Deadline header the worker has no deadline of its own (fdk would assume 30s), so it
+    # gets the one a Functions invocation would have: what is left of the coordinator's time budget
+    deadline, headers = None, {}
+    if payload.get("time_budget_seconds") is not None:
+        deadline = (datetime.now(timezone.utc) + timedelta(seconds=payload["time_budget_seconds"])).isoformat()
+        headers = {'fn-deadline': deadline}
+    ctx = context.InvokeContext('local', 'local', 'local', 'copyusagereport', 'local-worker',
+                                deadline=deadline, config=cfg, headers=headers)
+    result = handler(ctx, io.BytesIO(json.dumps(payload).encode('utf-8')))
+    return {"status_code": result.status_code, "body": json.loads(result.response_data)}
+
+
+class _LocalInvoker:
+    """
+    Stand-in for the Functions invoke API when testing: runs each shard in a new Python process that loads
+    this func.py and calls handler() with this invocation's config, as a worker invocation would. The
+    process is started fresh rather than forked, because forking this threaded process can copy locks
+    held by other threads and pooled connections in use; the worker creates its own clients.
+    """
+    
+    # Loads func.py by path (fdk does not register it in sys.modules); the handler logs to stderr, the
+    # response goes to stdout
+    WORKER_SCRIPT = (
+        "import importlib.util, json, sys\n"
+        "spec = importlib.util.spec_from_file_location('func', sys.argv[1])\n"
+        "func = importlib.util.module_from_spec(spec)\n"
+        "spec.loader.exec_module(func)\n"
+        "request = json.load(sys.stdin)\n"
+        "out, sys.stdout = sys.stdout, sys.stderr\n"
+        "out.write(json.dumps(func._run_local_worker(request['cfg'], request['payload'])))\n"
+    )
+    
+    def __init__(self, cfg):
+        self._cfg = dict(cfg)
+    
+    def __call__(self, payload):
+        import subprocess  # deferred: only the local invoker starts processes
+        process = subprocess.run(
+            [sys.executable, '-c', self.WORKER_SCRIPT, os.path.abspath(__file__)],
+            input=json.dumps({"cfg": self._cfg, "payload": payload}), stdout=subprocess.PIPE, text=True)
+        if process.returncode != 0 or not process.stdout:
+            raise RuntimeError(f"Local worker exited with code {process.returncode} without a response")
+        return json.loads(process.stdout)
+
+
+def _worker_retry_decision(ex):
+    """
+    Classify a failed worker invocation as (retryable, throttled, retry_after) for the controller. Only a
+    429 (no function instance was free, so the worker never ran) and a connection failure before the
+    request was sent are retried: after any other failure the worker may have copied part of its shard,
+    and a second worker would copy it again. Its objects are reported as failed instead.
+    """
+    import oci.exceptions  # already loaded with the client
+    
+    if isinstance(ex, oci.exceptions.ServiceError):
+        # Not 'throttled': the Object Storage concurrency limit is unaffected by Functions capacity
+        return ex.status == 429, False, _retry_after_seconds(ex.headers)
+    connect_errors = (oci.exceptions.ConnectTimeout, ConnectionRefusedError)
+    for module_name in ('urllib3.exceptions', 'oci._vendor.urllib3.exceptions'):
+        urllib3_exceptions = sys.modules.get(module_name)
+        if urllib3_exceptions is not None:
+            # Also NewConnectionError (refused, unresolvable host), a subclass
+            connect_errors += (urllib3_exceptions.ConnectTimeoutError,)
+    # The SDK and requests wrap the urllib3 error (RequestException(ConnectionError(MaxRetryError(reason))))
+    causes, seen = [ex], set()
+    while causes:
+        cause = causes.pop()
+        if cause is None or id(cause) in seen:
+            continue
+        seen.add(id(cause))
+        if isinstance(cause, connect_errors):
+            return True, False, None
+        causes.extend([cause.__cause__, cause.__context__, getattr(cause, 'reason', None)])
+        causes.extend(arg for arg in cause.args if isinstance(arg, BaseException))
+    return False, False, None
+
+
+def _coordinate(report_objects, report_dates, transfers, invoker, workers):
+    """
+    Coordinator mode: split the listed objects into size-balanced shards and copy each shard in its own
+    worker invocation, all shards in parallel, so throughput grows with the number of workers.
+    
+    Objects already recorded in every destination manifest are skipped without being dispatched. The
+    workers' file entries are gathered in listing order, and their byte and retry counters are added to
+    this invocation's metrics. Returns the file entries and one summary per worker.
+    """
+    transfer = transfers[0]
+    metrics = transfer["metrics"]
+    entries = {}
+    pending = []
+    for o in report_objects:
+        skipped = _manifest_skip_entry(o, transfers)
+        if skipped is not None:
+            entries[o.name] = skipped
+        else:
+            pending.append(o)
+    shards = _size_balanced_shards(pending, workers)
+    logger.info(f"Coordinating {len(pending)} object(s) in {len(shards)} shard(s), "
+                f"{len(report_objects) - len(pending)} unchanged object(s) skipped")
+    
+    def dispatch(numbered_shard):
+        number, shard = numbered_shard
+        summary = {"shard": number, "objects": len(shard), "bytes": sum(o.size or 0 for o in shard)}
+        payload = {
+            "shard": [{"name": o.name, "size": o.size, "md5": o.md5, "etag": o.etag} for o in shard],
+            "start_date": report_dates[0].strftime('%Y-%m-%d'),
+            "end_date": report_dates[-1].strftime('%Y-%m-%d')
+        }
+        started = time.perf_counter()
+        
+        def invoke():
+            if transfer["deadline"] is not None:
+                # Recomputed for every attempt, so a retried worker still finishes before this invocation
+                budget = transfer["deadline"] - time.monotonic()
+                if budget <= 0:
+                    return None
+                payload["time_budget_seconds"] = budget
+            return invoker(payload)
+        
+        try:
+            # Not gated: a worker invocation is long-running and not one request of the shared concurrency.
+            # Retried only when the worker cannot have started; otherwise its own per-file results decide
+            with metrics.timed("worker"):
+                invoked = transfer["controller"].call(invoke, f"Worker shard {number}", gated=False,
+                                                      retry_decision=_worker_retry_decision)
+            if invoked is None:
+                # No time left to (re)invoke the worker: its objects are deferred to the continuation
+                summary.update(status="deferred", seconds=round(time.perf_counter() - started, 3))
+                return summary, []
+            body = invoked["body"]
+            if "files" not in body:
+                raise RuntimeError(f"Worker shard {number} failed ({invoked['status_code']}): {body.get('error') or body.get('message')}")
+            for counter, value in (body.get("metrics") or {}).get("counters", {}).items():
+                if not counter.startswith("objects_"):
+                    metrics.add(counter, value)
+            files = body["files"]
+            # An error response (status 500) may lack the counts
+            summary.update(status="ok",
+                           files_processed=body.get("files_processed", sum(1 for f in files if f.get("status") == "copied")),
+                           files_failed=body.get("files_failed", sum(1 for f in files if f.get("status") == "failed")))
+            if "error" in body:
+                # e.g. a listing or time budget error: the files the worker did report are still kept
+                logger.error(f"Worker shard {number} reported an error: {body['error']}")
+                summary.update(status="failed", error=body["error"])
+        except Exception as ex:
+            logger.error(f"Worker shard {number} failed: {str(ex)}")
+            summary.update(status="failed", error=str(ex))
+            files = [{"source": o.name, "destination": None, "size": o.size, "md5": o.md5,
+                      "cross_tenancy": transfer["use_cross_tenancy"], "status": "failed", "error": str(ex)} for o in shard]
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        return summary, files
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(shards))) as dispatch_executor:
+        dispatched = list(dispatch_executor.map(dispatch, enumerate(shards, start=1)))
+    for _, files in dispatched:
+        for f in files:
+            entries[f["source"]] = f
+    
+    processed_files = []
+    for o in report_objects:
+        # An object a worker did not report (its time budget ran out first) is left for the continuation
+        entry = entries.get(o.name) or {"source": o.name, "destination": None, "size": o.size, "md5": o.md5,
+                                        "cross_tenancy": transfer["use_cross_tenancy"], "status": "deferred"}
+        if entry["status"] == "deferred":
+            transfer["stop"].set()
+        processed_files.append(entry)
+    return processed_files, [summary for summary, _ in dispatched]
+
+
+def _manifest_object_name(secret_b64=None):
+    """Manifest object name; carries the secret prefix so xtenancycheck does not delete it."""
+    if secret_b64:
+        return f"{secret_b64}_{MANIFEST_OBJECT_NAME}"
+    return MANIFEST_OBJECT_NAME
+
+
+def _load_manifest(transfer):
+    """
+    Load the incremental sync manifest from the destination bucket (or via the PAR).
+    
+    Returns (entries, etag). entries maps source object name to {"md5", "size", "destination"}
+    and is None when the manifest cannot be read (e.g. a write-only PAR), which disables skipping.
+    """
+    import oci.exceptions
+    
+    manifest_name = _manifest_object_name(transfer["secret_b64"])
+    try:
+        if transfer["use_cross_tenancy"]:
+            def get_manifest():
+                par_response = transfer["http"].get(_par_upload_url(transfer["x_tenancy_par"], manifest_name))
+                if par_response.status_code != 404:
+                    par_response.raise_for_status()
+                return par_response
+            par_response = transfer["controller"].call(get_manifest, f"Manifest read '{manifest_name}'")
+            if par_response.status_code == 404:
+                return {}, None
+            manifest = par_response.json()
+            etag = par_response.headers.get('etag')
+        else:
+            manifest_response = transfer["controller"].call(
+                lambda: transfer["object_storage"].get_object(transfer["namespace"], transfer["bucket_name"], manifest_name),
+                f"Manifest read '{manifest_name}'")
+            manifest = json.loads(manifest_response.data.content)
+            etag = manifest_response.headers.get('etag')
+    except oci.exceptions.ServiceError as ex:
+        if ex.status == 404:
+            return {}, None
+        logger.warning(f"Could not read manifest '{manifest_name}', copying all objects: {str(ex)}")
+        return None, None
+    except Exception as ex:
+        logger.warning(f"Could not read manifest '{manifest_name}', copying all objects: {str(ex)}")
+        return None, None
+    return manifest.get("objects", {}), etag
+
+
+def _manifest_entry_matches(entry, o, object_name):
+    """True when the manifest records this exact source object (same checksum and size) at the same destination."""
+    return bool(
+        entry and o.md5 and
+        entry.get("md5") == o.md5 and
+        entry.get("size") == o.size and
+        entry.get("destination") == object_name
+    )
+
+
+def _prune_manifest(entries, oldest_report_date=None):
+    """
+    Drop entries for reports older than MANIFEST_RETENTION_DAYS (or than the oldest report date of
+    this run, for backfills) so the manifest stays compact.
+    """
+    cutoff_date = datetime.now() - timedelta(days=MANIFEST_RETENTION_DAYS)
+    if oldest_report_date is not None:
+        cutoff_date = min(cutoff_date, oldest_report_date)
+    cutoff = cutoff_date.strftime('%Y/%m/%d')
+    kept = {}
+    for name, entry in entries.items():
+        # Source names look like 'FOCUS Reports/YYYY/MM/DD/<file>'
+        parts = name.split('/')
+        if len(parts) >= 5 and '/'.join(parts[1:4]) < cutoff:
+            continue
+        kept[name] = entry
+    return kept
+
+
+def _save_manifest(transfer, updates, etag):
+    """
+    Write the manifest back with a conditional PUT (If-Match / If-None-Match) so concurrent runs never
+    overwrite each other's entries; on a conflict the manifest is reloaded, merged and written again.
+    """
+    import oci.exceptions
+    
+    manifest_name = _manifest_object_name(transfer["secret_b64"])
+    entries = transfer["manifest"]
+    for attempt in range(MANIFEST_SAVE_ATTEMPTS):
+        merged = dict(entries)
+        merged.update(updates)
+        body = json.dumps({"version": 1, "objects": _prune_manifest(merged, transfer.get("oldest_report_date"))}, separators=(',', ':')).encode('utf-8')
+        if transfer["use_cross_tenancy"]:
+            headers = {'Content-Type': 'application/json'}
+            if etag:
+                headers['If-Match'] = etag
+            else:
+                headers['If-None-Match'] = '*'
+            
+            def put_manifest():
+                par_response = transfer["http"].put(_par_upload_url(transfer["x_tenancy_par"], manifest_name), data=body, headers=headers)
+                if par_response.status_code != 412:
+                    par_response.raise_for_status()
+                return par_response
+            conflict = transfer["controller"].call(put_manifest, f"Manifest update '{manifest_name}'").status_code == 412
+        else:
+            try:
+                transfer["controller"].call(lambda: transfer["object_storage"].put_object(
+                    namespace_name=transfer["namespace"],
+                    bucket_name=transfer["bucket_name"],
+                    object_name=manifest_name,
+                    put_object_body=body,
+                    content_type='application/json',
+                    if_match=etag or None,
+                    if_none_match=None if etag else '*'
+                ), f"Manifest update '{manifest_name}'")
+                conflict = False
+            except oci.exceptions.ServiceError as ex:
+                if ex.status != 412:
+                    raise
+                conflict = True
+        if not conflict:
+            logger.info(f"Updated manifest '{manifest_name}' with {len(updates)} new entry(ies)")
+            return
+        logger.warning(f"Manifest '{manifest_name}' changed concurrently, merging and retrying ({attempt + 1}/{MANIFEST_SAVE_ATTEMPTS})")
+        transfer["metrics"].add("retries")
+        entries, etag = _load_manifest(transfer)
+        if entries is None:
+            break
+    raise RuntimeError(f"Could not update manifest '{manifest_name}' after {MANIFEST_SAVE_ATTEMPTS} attempt(s)")
+
+
 def handler(ctx, data: io.BytesIO = None):
     processed_files = []
+    metrics = _Metrics(counters=("bytes_in", "bytes_out", "retries", "throttled"))
+    cfg = {}
     try:
         cfg = dict(ctx.Config()) if ctx is not None else {}
         reporting_namespace = 'bling'
@@ -19,27 +2293,50 @@ def handler(ctx, data: io.BytesIO = None):
         # Get tenancy_ocid from config or auto-retrieve
         tenancy_ocid = cfg.get('tenancy_ocid')
         
+        # Optional fan-out to several buckets/PARs; replaces bucket_name, secret and x-tenancy_par
+        destinations = _parse_destinations(cfg)
+        
         bucket_name = cfg.get('bucket_name')
-        if not bucket_name:
+        if not bucket_name and not destinations:
             raise ValueError("Missing required config key 'bucket_name'. Set it with 'fn config function <app> copyusagereport bucket_name <bucket_name>'.")
         
+        # Optional request payload: {"continuation_token": "..."} resumes a run that hit its time budget;
+        # {"shard": [...], ...} is a worker invocation dispatched by a coordinator (see 'workers')
+        continuation = None
+        shard = None
+        raw_payload = data.read() if data is not None else b''
+        if raw_payload and raw_payload.strip():
+            try:
+                payload = json.loads(raw_payload)
+            except ValueError:
+                logger.warning("Ignoring request payload that is not JSON")
+                payload = {}
+            if isinstance(payload, dict) and payload.get('continuation_token'):
+                continuation = _decode_continuation_token(payload['continuation_token'])
+                logger.info(f"Resuming after '{continuation.get('start_after')}'")
+            if isinstance(payload, dict) and isinstance(payload.get('shard'), list):
+                if not payload.get('start_date') or not payload.get('end_date'):
+                    raise ValueError("Worker payload needs 'start_date' and 'end_date'.")
+                shard = payload
+                logger.info(f"Worker invocation: copying {len(shard['shard'])} object(s) of a coordinator shard")
+        
         # Optional parameters for cross-tenancy upload
         secret = cfg.get('secret')
         x_tenancy_par = cfg.get('x-tenancy_par')
         
-        # Check if /config exists (OCI CLI config for local testing)
-        if os.path.exists('/config'):
-            logger.info("Found /config file, using OCI CLI authentication")
-            config = oci.config.from_file('/config')
-            object_storage = oci.object_storage.ObjectStorageClient(config)
+        with metrics.timed("auth"):
+            clients = _get_object_storage()
+        object_storage = clients["object_storage"]
+        if clients["signer"] is None:
+            config = clients["config"]
+            region = config.get('region')
             # Auto-retrieve tenancy_ocid from config if not provided
             if not tenancy_ocid:
                 tenancy_ocid = config.get('tenancy')
                 logger.info(f"Auto-retrieved tenancy_ocid from CLI config: {tenancy_ocid}")
         else:
-            logger.info("No /config file found, using Resource Principal authentication")
-            Signer = oci.auth.signers.get_resource_principals_signer()
-            object_storage = oci.object_storage.ObjectStorageClient(config={}, signer=Signer)
+            Signer = clients["signer"]
+            region = Signer.region
             # Auto-retrieve tenancy_ocid from signer if not provided
             if not tenancy_ocid:
                 try:
@@ -53,7 +2350,13 @@ def handler(ctx, data: io.BytesIO = None):
             raise ValueError("Missing required config key 'tenancy_ocid'. Set it with 'fn config function <app> copyusagereport tenancy_ocid <tenancy_ocid>'.")
         
         logger.info(f"Starting report copy process")
-        logger.info(f"Configuration - tenancy_ocid: {tenancy_ocid}, bucket_name: {bucket_name}")
+        if destinations:
+            logger.info(f"Configuration - tenancy_ocid: {tenancy_ocid}, destinations: {', '.join(d['name'] for d in destinations)}")
+            if bucket_name or secret or x_tenancy_par:
+                logger.info("Config key 'destinations' is set; 'bucket_name', 'secret' and 'x-tenancy_par' are ignored")
+                bucket_name, secret, x_tenancy_par = None, None, None
+        else:
+            logger.info(f"Configuration - tenancy_ocid: {tenancy_ocid}, bucket_name: {bucket_name}")
         
         # Secret prefix: use when secret is defined (for both in-tenancy and cross-tenancy)
         # so xtenancycheck validation works consistently.
@@ -80,151 +2383,415 @@ def handler(ctx, data: io.BytesIO = None):
         days = max(0, min(days, 31))  # clamp 0-31
         logger.info(f"Looking back {days} day(s) for reports")
         
-        report_date = datetime.now() - timedelta(days=days)
-        prefix_file = f"FOCUS Reports/{report_date.year}/{report_date.strftime('%m')}/{report_date.strftime('%d')}"
-        logger.info(f"Looking for reports with prefix: {prefix_file}")
+        # Number of objects copied in parallel (default 4)
+        try:
+            max_concurrency = int(cfg.get('max_concurrency', DEFAULT_MAX_CONCURRENCY))
+        except (TypeError, ValueError):
+            max_concurrency = DEFAULT_MAX_CONCURRENCY
+        max_concurrency = max(1, min(max_concurrency, MAX_CONCURRENCY_LIMIT))  # clamp 1-32
+        
+        # Transfer mode: 'staged' downloads to /tmp before upload, 'stream' pipes source to destination
+        transfer_mode = str(cfg.get('transfer_mode', 'staged')).strip().lower()
+        if transfer_mode not in TRANSFER_MODES:
+            raise ValueError(f"Invalid config key 'transfer_mode': '{transfer_mode}'. Use one of: {', '.join(TRANSFER_MODES)}.")
+        if transfer_mode == 'server' and use_cross_tenancy:
+            raise ValueError("Config key 'transfer_mode' 'server' cannot be used with 'x-tenancy_par'; use 'staged' or 'stream' for PAR uploads.")
+        if transfer_mode == 'server' and destinations and any(d["x_tenancy_par"] for d in destinations):
+            raise ValueError("Config key 'transfer_mode' 'server' cannot be used with 'par' destinations; use 'staged' or 'stream' for PAR uploads.")
+        logger.info(f"Transfer mode: {transfer_mode}")
+        
+        # Multipart upload for large files: threshold (default 128 MB, 0 disables), part size
+        # (default 32 MB, range 10-512) and parallel parts per file (default 4, range 1-16)
+        try:
+            multipart_threshold_mb = int(cfg.get('multipart_threshold_mb', DEFAULT_MULTIPART_THRESHOLD_MB))
+        except (TypeError, ValueError):
+            multipart_threshold_mb = DEFAULT_MULTIPART_THRESHOLD_MB
+        multipart_threshold_mb = max(0, multipart_threshold_mb)
+        try:
+            multipart_part_size_mb = int(cfg.get('multipart_part_size_mb', DEFAULT_MULTIPART_PART_SIZE_MB))
+        except (TypeError, ValueError):
+            multipart_part_size_mb = DEFAULT_MULTIPART_PART_SIZE_MB
+        multipart_part_size_mb = max(10, min(multipart_part_size_mb, 512))  # clamp 10-512
+        try:
+            multipart_concurrency = int(cfg.get('multipart_concurrency', DEFAULT_MULTIPART_CONCURRENCY))
+        except (TypeError, ValueError):
+            multipart_concurrency = DEFAULT_MULTIPART_CONCURRENCY
+        multipart_concurrency = max(1, min(multipart_concurrency, 16))  # clamp 1-16
+        
+        # Seconds to wait for server-side copy work requests (default 240)
+        try:
+            copy_timeout = int(cfg.get('copy_timeout', DEFAULT_COPY_TIMEOUT))
+        except (TypeError, ValueError):
+            copy_timeout = DEFAULT_COPY_TIMEOUT
+        copy_timeout = max(0, min(copy_timeout, 3600))  # clamp 0-3600
+        
+        # Time budget: the invocation deadline and/or 'time_budget_seconds', minus a safety margin
+        # ('deadline_margin_seconds', default 15) kept for the response and manifest update
+        remaining = _seconds_until_deadline(ctx)
+        try:
+            time_budget = float(cfg['time_budget_seconds']) if cfg.get('time_budget_seconds') else None
+        except (TypeError, ValueError):
+            time_budget = None
+        if time_budget is not None:
+            remaining = time_budget if remaining is None else min(remaining, time_budget)
+        if shard is not None and shard.get('time_budget_seconds') is not None:
+            # A worker finishes within what was left of the coordinator's time budget
+            remaining = float(shard['time_budget_seconds']) if remaining is None else min(remaining, float(shard['time_budget_seconds']))
+        try:
+            deadline_margin = float(cfg.get('deadline_margin_seconds', DEFAULT_DEADLINE_MARGIN))
+        except (TypeError, ValueError):
+            deadline_margin = DEFAULT_DEADLINE_MARGIN
+        deadline = time.monotonic() + remaining - max(0.0, deadline_margin) if remaining is not None else None
+        if deadline is not None:
+            logger.info(f"Time budget: {remaining:.0f}s ({deadline_margin:.0f}s safety margin)")
+        
+        # Attempts per request for throttled (429/503) and transient failures (default 5)
+        try:
+            retry_attempts = int(cfg.get('retry_attempts', DEFAULT_RETRY_ATTEMPTS))
+        except (TypeError, ValueError):
+            retry_attempts = DEFAULT_RETRY_ATTEMPTS
+        retry_attempts = max(1, min(retry_attempts, 10))  # clamp 1-10
+        
+        # Optional SHA-256 in addition to the MD5 computed on every copied chunk
+        checksum_sha256 = str(cfg.get('checksum_sha256', 'false')).strip().lower() in ('true', '1', 'yes')
+        
+        # Output format: 'csv' copies reports unchanged, 'parquet' converts them to Parquet (needs pyarrow)
+        output_format = str(cfg.get('output_format', 'csv')).strip().lower()
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Invalid config key 'output_format': '{output_format}'. Use one of: {', '.join(OUTPUT_FORMATS)}.")
+        if output_format == 'parquet':
+            if transfer_mode == 'server':
+                raise ValueError("Config key 'output_format' 'parquet' needs transfer_mode 'staged' or 'stream'; server-side copies cannot convert reports.")
+            _import_pyarrow()
+        # Reports converted at once (default 1); each conversion holds about 150 MB
+        try:
+            parquet_concurrency = int(cfg.get('parquet_concurrency', DEFAULT_PARQUET_CONCURRENCY))
+        except (TypeError, ValueError):
+            parquet_concurrency = DEFAULT_PARQUET_CONCURRENCY
+        parquet_concurrency = max(1, min(parquet_concurrency, 8))  # clamp 1-8
+        if output_format == 'parquet':
+            logger.info(f"Output format: parquet, {parquet_concurrency} conversion(s) at a time")
+            # Fn sets FN_MEMORY to the function's memory limit in MB
+            try:
+                memory_mb = int(os.environ.get('FN_MEMORY', '0'))
+            except ValueError:
+                memory_mb = 0
+            if 0 < memory_mb < PARQUET_MIN_MEMORY_MB:
+                logger.warning(f"Function memory is {memory_mb} MB; output_format 'parquet' needs at least {PARQUET_MIN_MEMORY_MB} MB and may be killed out of memory")
+        
+        # Optional FOCUS rollup: cost/usage totals parsed from the copied bytes and written next to each report
+        rollup = str(cfg.get('rollup', 'false')).strip().lower() in ('true', '1', 'yes')
+        if rollup and transfer_mode == 'server':
+            raise ValueError("Config key 'rollup' needs transfer_mode 'staged' or 'stream'; server-side copies do not pass the report through the function.")
+        if rollup:
+            logger.info(f"Rollup enabled: writing '<report>{ROLLUP_SUFFIX}' summaries next to copied reports")
+        
+        # Incremental sync: skip objects already recorded in the destination manifest
+        incremental = str(cfg.get('incremental', 'false')).strip().lower() in ('true', '1', 'yes')
+        if incremental:
+            logger.info("Incremental sync enabled")
+        
+        # Coordinator mode: split the listed objects into size-balanced shards copied by 'workers'
+        # invocations of this function (default 0, off), through the Functions API or local processes
+        try:
+            workers = int(cfg.get('workers', 0))
+        except (TypeError, ValueError):
+            workers = 0
+        workers = max(0, min(workers, MAX_WORKERS))  # clamp 0-64
+        if shard is not None:
+            workers = 0  # a worker copies its shard itself and never dispatches further workers
+        worker_invoker = str(cfg.get('worker_invoker', 'fn')).strip().lower()
+        if workers:
+            if worker_invoker not in WORKER_INVOKERS:
+                raise ValueError(f"Invalid config key 'worker_invoker': '{worker_invoker}'. Use one of: {', '.join(WORKER_INVOKERS)}.")
+            logger.info(f"Coordinator mode: up to {workers} worker invocation(s) ({worker_invoker})")
+        
+        # Single look-back day, or a start_date/end_date or window_days range for catch-up and backfill
+        if shard is not None:
+            # Workers use the coordinator's date range for destination names and continuation tokens
+            report_dates = _report_dates({'start_date': shard['start_date'], 'end_date': shard['end_date']}, days)
+        elif continuation:
+            # Resumed runs keep the date range of the original run, even across midnight
+            report_dates = _report_dates({'start_date': continuation['start_date'], 'end_date': continuation['end_date']}, days)
+        else:
+            report_dates = _report_dates(cfg, days)
+        first_prefix, last_prefix = _report_prefix(report_dates[0]), _report_prefix(report_dates[-1])
+        if len(report_dates) == 1:
+            logger.info(f"Looking for reports with prefix: {first_prefix}")
+        else:
+            logger.info(f"Looking for reports in {len(report_dates)} daily prefixes: {first_prefix} .. {last_prefix}")
         logger.info(f"Reporting namespace: {reporting_namespace}")
         logger.info(f"Source bucket OCID: {tenancy_ocid}")
         
         destination_path = '/tmp'
         
-        # Get namespace using SDK
-        namespace_response = object_storage.get_namespace()
-        namespace = namespace_response.data
-        logger.info(f"Retrieved namespace: {namespace}")
-        
-        # List objects in the reporting bucket
-        logger.info(f"Listing objects in namespace '{reporting_namespace}', bucket '{tenancy_ocid}', prefix '{prefix_file}'")
-        report_bucket_objects = oci.pagination.list_call_get_all_results(
-            object_storage.list_objects, 
-            reporting_namespace, 
-            tenancy_ocid, 
-            prefix=prefix_file
+        # Shared retry/AIMD controller; its ceiling covers every request the worker pools can issue at once
+        controller = _TransferController(
+            max_concurrency * max(multipart_concurrency, len(destinations or ())),
+            attempts=retry_attempts,
+            metrics=metrics,
+            deadline=deadline
         )
         
-        object_count = len(report_bucket_objects.data.objects) if report_bucket_objects.data.objects else 0
-        logger.info(f"Found {object_count} object(s) matching the prefix")
+        # Get namespace using SDK (once per container)
+        if not clients["namespace"]:
+            with metrics.timed("get_namespace"):
+                clients["namespace"] = controller.call(object_storage.get_namespace, "Namespace lookup").data
+            logger.info(f"Retrieved namespace: {clients['namespace']}")
+        namespace = clients["namespace"]
         
-        if object_count == 0:
-            logger.warning(f"No objects found with prefix '{prefix_file}' in bucket '{tenancy_ocid}'")
-            logger.info("Available prefixes/objects in bucket (first 10):")
+        # Copy objects concurrently; results keep the listing order
+        transfer = {
+            "object_storage": object_storage,
+            "reporting_namespace": reporting_namespace,
+            "tenancy_ocid": tenancy_ocid,
+            "namespace": namespace,
+            "bucket_name": bucket_name,
+            "oldest_report_date": report_dates[0],
+            "destination_path": destination_path,
+            "transfer_mode": transfer_mode,
+            "region": region,
+            "multipart_threshold": multipart_threshold_mb * 1024 * 1024,
+            "multipart_part_size": multipart_part_size_mb * 1024 * 1024,
+            "multipart_concurrency": multipart_concurrency,
+            "checksum_sha256": checksum_sha256,
+            "rollup": rollup,
+            "output_format": output_format,
+            "parquet_executor": _get_parquet_executor(parquet_concurrency) if output_format == 'parquet' else None,
+            "secret_b64": base64.b64encode(secret.encode('utf-8')).decode('utf-8') if use_secret_prefix else None,
+            "use_cross_tenancy": use_cross_tenancy,
+            "x_tenancy_par": x_tenancy_par,
+            "http": _get_http_session() if use_cross_tenancy or any(d["x_tenancy_par"] for d in destinations or ()) else None,
+            "deadline": deadline,
+            "stop": threading.Event(),
+            "throughput": {"bytes": 0, "seconds": 0.0, "started": 0},
+            "throughput_lock": threading.Lock(),
+            "metrics": metrics,
+            "controller": controller
+        }
+        
+        # Fan-out: one view of the transfer settings per destination; each object is read once for all of them
+        if destinations:
+            destination_transfers = [_destination_transfer(transfer, d) for d in destinations]
+        else:
+            destination_transfers = [transfer]
+        
+        # Loaded once per invocation and destination; objects with a matching checksum are skipped.
+        # A coordinator already skipped them before dispatching, and saves the manifest for its workers
+        if incremental and shard is None:
+            with metrics.timed("manifest_load"):
+                for t in destination_transfers:
+                    t["manifest"], t["manifest_etag"] = _load_manifest(t)
+        
+        # List objects in the reporting bucket; pages feed the transfer pool as they arrive.
+        # A worker copies the objects of its shard, as listed by the coordinator
+        if shard is not None:
+            import oci.object_storage
+            report_objects = (
+                oci.object_storage.models.ObjectSummary(name=s["name"], size=s.get("size"), md5=s.get("md5"), etag=s.get("etag"))
+                for s in shard["shard"]
+            )
+        else:
+            report_objects = _iter_report_objects_for_dates(
+                object_storage, reporting_namespace, tenancy_ocid, report_dates, max_concurrency,
+                start_after=continuation.get('start_after') if continuation else None,
+                metrics=metrics,
+                controller=controller
+            )
+        # Stop listing once the time budget is exhausted; the rest is left for the continuation
+        report_objects = itertools.takewhile(lambda o: not transfer["stop"].is_set(), report_objects)
+        worker_results = None
+        listing_error = None
+        if workers:
+            if worker_invoker == 'local':
+                invoker = _LocalInvoker(cfg)
+            else:
+                function_id = cfg.get('worker_function_id') or (ctx.FnID() if hasattr(ctx, 'FnID') else None)
+                if not function_id:
+                    raise ValueError("Missing config key 'worker_function_id'; the function OCID is needed to invoke workers.")
+                invoker = _FnInvoker(clients, function_id, cfg.get('worker_invoke_endpoint'), controller)
+            # Objects listed before a listing error are still dispatched, as in the pool below
+            listed = []
             try:
-                all_objects = oci.pagination.list_call_get_all_results(
-                    object_storage.list_objects,
-                    reporting_namespace,
-                    tenancy_ocid
+                for o in report_objects:
+                    listed.append(o)
+            except Exception as ex:
+                listing_error = ex
+            # Workers wait for their own server-side copies
+            processed_files, worker_results = _coordinate(listed, report_dates, destination_transfers, invoker, workers)
+        else:
+            logger.info(f"Copying objects with max_concurrency={max_concurrency}")
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                processed_files, listing_error = _map_in_order(
+                    executor,
+                    (lambda o: _process_report_object(o, destination_transfers[0])) if len(destination_transfers) == 1
+                    else (lambda o: _fan_out_report_object(o, destination_transfers)),
+                    report_objects,
+                    max_in_flight=max_concurrency * 2
                 )
-                if all_objects.data.objects:
-                    for obj in all_objects.data.objects[:10]:
+                if transfer_mode == 'server':
+                    if deadline is not None:
+                        copy_timeout = max(0, min(copy_timeout, deadline - time.monotonic()))
+                    with metrics.timed("server_wait"):
+                        _wait_for_server_copies([e for f in processed_files for e in f.get("destinations", [f])],
+                                                transfer, executor, copy_timeout)
+                    for f in processed_files:
+                        if "destinations" in f:
+                            f["status"] = _fan_out_status(f["destinations"])
+        
+        if listing_error is not None:
+            # Objects listed before the failure were copied; they are reported and recorded in the
+            # manifest, and the continuation token resumes after them
+            logger.error(f"Listing failed after {len(processed_files)} object(s): {str(listing_error)}")
+        
+        object_count = len(processed_files)
+        logger.info(f"Found {object_count} object(s) matching the prefix(es)")
+        if metrics.counters["throttled"]:
+            logger.warning(f"Throttled {metrics.counters['throttled']} time(s); concurrency limit went down to "
+                           f"{int(controller.min_limit)} of {controller.max_concurrency}")
+        
+        if object_count == 0 and listing_error is None:
+            logger.warning(f"No objects found with prefix(es) '{first_prefix}' .. '{last_prefix}' in bucket '{tenancy_ocid}'")
+            logger.info("Available prefixes/objects in bucket (first 10):")
+            try:
+                # A single page of 10 names is enough for the diagnostic; never scan the whole bucket
+                sample_objects = object_storage.list_objects(reporting_namespace, tenancy_ocid, limit=10).data.objects
+                if sample_objects:
+                    for obj in sample_objects:
                         logger.info(f"  - {obj.name}")
                 else:
                     logger.info("  No objects found in bucket at all")
             except Exception as list_ex:
                 logger.error(f"Error listing all objects: {str(list_ex)}")
         
-        for o in report_bucket_objects.data.objects:
-            logger.info(f"Processing object: {o.name}")
-            object_details = object_storage.get_object(reporting_namespace, tenancy_ocid, o.name)
-            filename = o.name.rsplit('/', 1)[-1]
-            local_file_path = destination_path+'/'+filename
-            logger.info(f"Downloading to local path: {local_file_path}")
-            
-            with open(local_file_path, 'wb') as f:
-                for chunk in object_details.data.raw.stream(1024 * 1024, decode_content=False):
-                    f.write(chunk)
-            
-            logger.info(f"Downloaded {filename}, size: {o.size} bytes")
-            
-            with open(local_file_path, 'rb') as file_content:
-                # Build object name
-                base_object_name = f"{report_date.year}_{report_date.strftime('%m')}_{report_date.strftime('%d')}_{filename}"
-                
-                # Add secret prefix if cross-tenancy upload with secret is enabled
-                if use_secret_prefix:
-                    secret_b64 = base64.b64encode(secret.encode('utf-8')).decode('utf-8')
-                    object_name = f"{secret_b64}_{base_object_name}"
-                    logger.info(f"Added secret prefix to filename: {object_name}")
-                else:
-                    object_name = base_object_name
-                
-                # Upload using cross-tenancy PAR or standard method
-                if use_cross_tenancy:
-                    logger.info(f"Uploading via cross-tenancy PAR to object '{object_name}'")
-                    # Use PAR URL for cross-tenancy upload
-                    # NOTE: PAR must be created at bucket root with write privileges, without prefix (directory)
-                    # PAR URL format: https://objectstorage.<region>.oraclecloud.com/p/<par_id>/n/<namespace>/b/<bucket>/o/<object>
-                    file_content.seek(0)  # Reset file pointer
-                    file_data = file_content.read()
-                    
-                    # Handle both bucket-level PAR (ends with /o/) and object-level PAR
-                    # Bucket-level PAR allows writing multiple objects, object-level PAR is for a specific object
-                    par_url = x_tenancy_par.rstrip('/')
-                    
-                    # Check if PAR URL ends with /o/ or /o (bucket-level PAR) or ends with the object name (object-level PAR)
-                    if par_url.endswith('/o') or par_url.endswith('/o/'):
-                        # Bucket-level PAR - append object name
-                        upload_url = f"{par_url}/{object_name}"
-                    elif par_url.endswith('/' + object_name):
-                        # Object-level PAR - use as-is
-                        upload_url = par_url
-                    else:
-                        # Assume bucket-level PAR and append object name
-                        upload_url = f"{par_url}/{object_name}"
-                    
-                    logger.info(f"Uploading to PAR URL: {upload_url[:100]}...")
-                    logger.info(f"File size: {len(file_data)} bytes")
-                    
-                    # Upload via PAR using PUT request
-                    # PAR URLs don't require authentication headers - the URL itself is the authentication
-                    headers = {
-                        'Content-Type': 'application/octet-stream',
-                        'Content-Length': str(len(file_data))
-                    }
-                    par_response = requests.put(upload_url, data=file_data, headers=headers)
-                    par_response.raise_for_status()
-                    logger.info(f"Successfully uploaded via PAR: {object_name} (Status: {par_response.status_code})")
-                else:
-                    logger.info(f"Uploading to destination namespace '{namespace}', bucket '{bucket_name}', object '{object_name}'")
-                    object_storage.put_object(
-                        namespace_name=namespace,
-                        bucket_name=bucket_name,
-                        object_name=object_name,
-                        put_object_body=file_content
-                    )
-                    logger.info(f"Successfully uploaded: {object_name}")
-                
-                processed_files.append({
-                    "source": o.name,
-                    "destination": object_name,
-                    "size": o.size,
-                    "cross_tenancy": use_cross_tenancy
+        for index, t in enumerate(destination_transfers):
+            if not incremental or t.get("manifest") is None:
+                continue
+            updates = {
+                f["source"]: {"md5": f["md5"], "size": f["size"], "destination": f["destination"]}
+                for f in _destination_entries(processed_files, index) if f["status"] == "copied" and f["md5"]
+            }
+            if updates:
+                try:
+                    with metrics.timed("manifest_save"):
+                        _save_manifest(t, updates, t["manifest_etag"])
+                except Exception as manifest_ex:
+                    # Copies already succeeded; the next run simply copies these objects again
+                    logger.error(f"Failed to update manifest: {str(manifest_ex)}", exc_info=True)
+        
+        copied_count = sum(1 for f in processed_files if f["status"] == "copied")
+        skipped_count = sum(1 for f in processed_files if f["status"] == "skipped")
+        pending_count = sum(1 for f in processed_files if f["status"] == "submitted")
+        deferred_count = sum(1 for f in processed_files if f["status"] == "deferred")
+        failed_count = len(processed_files) - copied_count - skipped_count - pending_count - deferred_count
+        metrics.add("objects_listed", len(processed_files))
+        for counter, count in (("objects_copied", copied_count), ("objects_skipped", skipped_count),
+                               ("objects_pending", pending_count), ("objects_deferred", deferred_count),
+                               ("objects_failed", failed_count)):
+            metrics.add(counter, count)
+        
+        # Per-destination status of a fan-out; PAR URLs are credentials and are never echoed
+        destination_results = None
+        if destinations:
+            destination_results = []
+            for index, t in enumerate(destination_transfers):
+                entries = _destination_entries(processed_files, index)
+                destination_failed = sum(1 for e in entries if e["status"] == "failed")
+                destination_results.append({
+                    "name": t["destination_name"],
+                    "bucket": t["bucket_name"],
+                    "cross_tenancy": t["use_cross_tenancy"],
+                    "status": "failed" if destination_failed else "ok",
+                    "files_processed": sum(1 for e in entries if e["status"] == "copied"),
+                    "files_failed": destination_failed,
+                    "files_pending": sum(1 for e in entries if e["status"] == "submitted"),
+                    "files_skipped": sum(1 for e in entries if e["status"] == "skipped")
                 })
         
-        result_message = f"Processed {len(processed_files)} file(s) successfully"
-        logger.info(result_message)
-        
-        return response.Response(
-            ctx, 
-            response_data=json.dumps({
-                "message": result_message,
-                "files_processed": len(processed_files),
-                "files": processed_files,
-                "namespace": namespace,
-                "source_bucket": tenancy_ocid,
-                "destination_bucket": bucket_name
-            })
+        # Continuation token: resume after the last object of the completed run of objects in listing order
+        continuation_token = None
+        # An invocation that deferred every object made no progress; a continuation would do the same again.
+        # A worker's deferred objects are handed back to its coordinator instead
+        stalled = deferred_count > 0 and deferred_count == len(processed_files) and listing_error is None and shard is None
+        if stalled:
+            logger.error(f"Time budget too short to start any of {deferred_count} file(s); no continuation_token issued")
+        elif transfer["stop"].is_set() or listing_error is not None:
+            start_after = continuation.get('start_after') if continuation else None
+            for f in processed_files:
+                if f["status"] not in COMPLETED_STATUSES:
+                    break
+                start_after = f["source"]
+            continuation_token = _encode_continuation_token(start_after, report_dates)
+            if listing_error is not None:
+                logger.warning(f"Listing incomplete; resume after '{start_after}'")
+            else:
+                logger.warning(f"Time budget exhausted, {deferred_count} file(s) deferred; resume after '{start_after}'")
+        
+        result_message = f"Processed {copied_count} file(s) successfully"
+        if skipped_count:
+            result_message += f", {skipped_count} unchanged file(s) skipped"
+        if pending_count:
+            result_message += f", {pending_count} server-side copy(ies) still in progress"
+        if stalled:
+            result_message += f", {deferred_count} file(s) not started: time budget too short"
+        elif deferred_count or continuation_token:
+            result_message += ", remaining files deferred to the next invocation (continuation_token)"
+        if metrics.counters.get("rollups_failed"):
+            result_message += f", {metrics.counters['rollups_failed']} rollup summary(ies) not written"
+        if failed_count:
+            result_message += f", {failed_count} file(s) failed"
+            if destination_results:
+                result_message += f" (destination(s): {', '.join(d['name'] for d in destination_results if d['status'] == 'failed')})"
+        if listing_error is not None:
+            result_message += ", listing failed before all reports were found (see error)"
+        if failed_count or listing_error is not None or stalled:
+            logger.error(result_message)
+        else:
+            logger.info(result_message)
+        
+        response_body = {
+            "message": result_message,
+            "files_processed": copied_count,
+            "files_failed": failed_count,
+            "files_pending": pending_count,
+            "files_skipped": skipped_count,
+            "files_deferred": deferred_count,
+            "continuation_token": continuation_token,
+            "files": processed_files,
+            "namespace": namespace,
+            "source_bucket": tenancy_ocid,
+            "destination_bucket": bucket_name,
+            "destinations": destination_results,
+            "workers": worker_results,
+            "start_date": report_dates[0].strftime('%Y-%m-%d'),
+            "end_date": report_dates[-1].strftime('%Y-%m-%d')
+        }
+        if listing_error is not None:
+            response_body["error"] = f"Listing failed: {str(listing_error)}"
+        elif stalled:
+            response_body["error"] = "Time budget too short to start any transfer; raise the function timeout or 'time_budget_seconds'."
+        return _respond(
+            ctx,
+            response_body,
+            # A worker reports failed files with 200: the Functions invoke API raises on a 500, which
+            # would lose the per-file results the coordinator merges into its own response
+            500 if (failed_count or listing_error is not None or stalled) and shard is None else 200,
+            metrics,
+            cfg
         )
         
     except (Exception, ValueError) as ex:
         error_msg = f'Error processing reports: {str(ex)}'
         logger.error(error_msg, exc_info=True)
-        return response.Response(
+        return _respond(
             ctx,
-            response_data=json.dumps({
+            {
                 "message": "Error processing reports",
                 "error": str(ex),
-                "files_processed": len(processed_files),
+                "files_processed": sum(1 for f in processed_files if f.get("status") == "copied"),
                 "files": processed_files
-            }),
-            status_code=500
+            },
+            500,
+            metrics,
+            cfg
         )
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Drift check for the helpers that copyusagereport and xtenancycheck share.
+
+Each function is deployed from its own directory, so both func.py files carry their own copy of the
+retry/concurrency controller, the metrics collector and exporters and the response helper. This
+script compares those copies (constants, functions and classes listed in SHARED) and fails with
+exit code 1 and a diff when they differ or one is missing, so a fix made in one file is not lost in
+the other. Run it before committing a change to either func.py, e.g. in CI.
+
+Usage:
+    python tools/check_shared_code.py
+"""
+import ast
+import difflib
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTIONS = ('copyusagereport', 'xtenancycheck')
+
+# Module-level names that must be identical in every func.py
+SHARED = (
+    'logger',
+    'DEFAULT_DEADLINE_MARGIN',
+    'METRICS_FORMATS',
+    'METRICS_EXPORT_TIMEOUT',
+    'DEFAULT_RETRY_ATTEMPTS',
+    'RETRY_BASE_DELAY',
+    'RETRY_MAX_DELAY',
+    'RETRY_AFTER_MAX_DELAY',
+    'THROTTLE_STATUSES',
+    'RETRYABLE_STATUSES',
+    '_client_cache',
+    '_client_cache_lock',
+    '_seconds_until_deadline',
+    '_Metrics',
+    '_prometheus_metrics',
+    '_otlp_metrics',
+    '_export_metrics',
+    '_respond',
+    '_retry_after_seconds',
+    '_retry_decision',
+    '_TransferController',
+)
+
+
+def top_level_sources(path):
+    """Return {name: source} for the module-level assignments, functions and classes of a file."""
+    with open(path) as f:
+        source = f.read()
+    sources = {}
+    for node in ast.parse(source).body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            sources[node.name] = ast.get_source_segment(source, node)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    sources[target.id] = ast.get_source_segment(source, node)
+    return sources
+
+
+def main():
+    paths = [os.path.join(REPO_ROOT, name, 'func.py') for name in FUNCTIONS]
+    reference_path, *other_paths = paths
+    reference = top_level_sources(reference_path)
+    problems = 0
+    for other_path in other_paths:
+        other = top_level_sources(other_path)
+        for name in SHARED:
+            if name not in reference or name not in other:
+                missing = reference_path if name not in reference else other_path
+                print(f"{name}: missing in {os.path.relpath(missing, REPO_ROOT)}")
+                problems += 1
+            elif reference[name] != other[name]:
+                print(f"{name}: copies differ")
+                sys.stdout.writelines(difflib.unified_diff(
+                    (reference[name] + '\n').splitlines(keepends=True), (other[name] + '\n').splitlines(keepends=True),
+                    os.path.relpath(reference_path, REPO_ROOT), os.path.relpath(other_path, REPO_ROOT)))
+                problems += 1
+    if problems:
+        print(f"{problems} shared definition(s) out of sync; apply the change to every func.py")
+        return 1
+    print(f"{len(SHARED)} shared definitions in sync")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,11 +3,664 @@ import json
 import logging
 import os
 import base64
-import oci
+import concurrent.futures
+import contextlib
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
 from fdk import response
 
+# The OCI SDK is imported lazily in _get_object_storage(): it is only needed when an object must be
+# deleted, so validation of correctly prefixed objects never pays for the SDK import or authentication.
+# Only the modules used here are imported; older SDK versions otherwise import every service package.
+os.environ.setdefault('OCI_PYTHON_SDK_NO_SERVICE_IMPORTS', 'true')
+
 logger = logging.getLogger()
 
+FUNCTION_NAME = 'xtenancycheck'
+DEFAULT_SWEEP_CONCURRENCY = 8
+SWEEP_PAGE_SIZE = 1000
+SWEEP_SAMPLE_SIZE = 100
+DEFAULT_DEADLINE_MARGIN = 15
+METRICS_FORMATS = ('prometheus', 'otlp')
+METRICS_EXPORT_TIMEOUT = 5
+DEFAULT_RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 20
+RETRY_AFTER_MAX_DELAY = 60
+THROTTLE_STATUSES = (429, 503)
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+# Signer and client are cached at module level so warm invocations of the same container
+# (one per object-create event) skip authentication, client construction and TLS handshakes.
+_client_cache = {}
+_client_cache_lock = threading.Lock()
+
+
+def _get_object_storage():
+    """
+    Return the cached Object Storage client, creating it on first use or when the auth source changed.
+    
+    The cache is keyed on the auth source (and the /config file's mtime) so config changes are picked up;
+    a cached Resource Principal signer refreshes its session token when it is about to expire.
+    """
+    import oci.auth.signers
+    import oci.config
+    import oci.object_storage
+    import oci.retry
+    
+    if os.path.exists('/config'):
+        cache_key = ('cli', os.path.getmtime('/config'))
+    else:
+        cache_key = ('resource_principal', os.environ.get('OCI_RESOURCE_PRINCIPAL_RPST'))
+    
+    with _client_cache_lock:
+        cached = _client_cache.get('object_storage')
+        if cached and cached["key"] == cache_key:
+            logger.info("Reusing cached Object Storage client")
+            if cached["signer"] is not None and hasattr(cached["signer"], 'get_security_token'):
+                # Refreshes the session token only when it is no longer valid
+                cached["signer"].get_security_token()
+            return cached["object_storage"]
+        
+        if cache_key[0] == 'cli':
+            logger.info("Found /config file, using OCI CLI authentication")
+            config = oci.config.from_file('/config')
+            signer = None
+            object_storage = oci.object_storage.ObjectStorageClient(config, retry_strategy=oci.retry.NoneRetryStrategy())
+        else:
+            logger.info("No /config file found, using Resource Principal authentication")
+            signer = oci.auth.signers.get_resource_principals_signer()
+            object_storage = oci.object_storage.ObjectStorageClient(config={}, signer=signer, retry_strategy=oci.retry.NoneRetryStrategy())
+        # SDK-level retries are disabled: requests are retried by the transfer controller, which also
+        # adapts concurrency to throttling, so retries are never nested.
+        
+        _client_cache['object_storage'] = {
+            "key": cache_key,
+            "object_storage": object_storage,
+            "signer": signer
+        }
+        return object_storage
+
+
+
+class _Metrics:
+    """
+    Per-invocation phase timings and counters.
+    
+    Thread-safe and cheap (a perf_counter pair and a short lock per recorded event), so it is always on.
+    Phase times are summed across worker threads and can exceed the wall time of the invocation.
+    """
+    
+    def __init__(self, counters=()):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.phases = {}
+        self.counters = {counter: 0 for counter in counters}
+    
+    @contextlib.contextmanager
+    def timed(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - started)
+    
+    def add_time(self, phase, seconds):
+        with self._lock:
+            entry = self.phases.setdefault(phase, {"seconds": 0.0, "count": 0})
+            entry["seconds"] += seconds
+            entry["count"] += 1
+    
+    def add(self, counter, value=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+    
+    def as_dict(self):
+        with self._lock:
+            wall_seconds = time.perf_counter() - self._started
+            counters = dict(self.counters)
+            phases = {name: {"seconds": round(entry["seconds"], 3), "count": entry["count"]}
+                      for name, entry in self.phases.items()}
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "mb_per_s": round(counters.get("bytes_out", 0) / wall_seconds / (1024 * 1024), 3) if wall_seconds > 0 else 0.0,
+            "phases": phases,
+            "counters": counters
+        }
+
+
+def _prometheus_metrics(metrics, function_name):
+    """Render a metrics snapshot in the Prometheus text exposition format (gauges, one sample per invocation)."""
+    labels = f'function="{function_name}"'
+    lines = [
+        "# TYPE oci_usage_reports_wall_seconds gauge",
+        f"oci_usage_reports_wall_seconds{{{labels}}} {metrics['wall_seconds']}",
+        "# TYPE oci_usage_reports_phase_seconds gauge"
+    ]
+    lines += [f'oci_usage_reports_phase_seconds{{{labels},phase="{name}"}} {entry["seconds"]}'
+              for name, entry in sorted(metrics["phases"].items())]
+    for name, value in sorted(metrics["counters"].items()):
+        lines += [f"# TYPE oci_usage_reports_{name} gauge", f"oci_usage_reports_{name}{{{labels}}} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def _otlp_metrics(metrics, function_name):
+    """Render a metrics snapshot as an OTLP/HTTP JSON ExportMetricsServiceRequest (gauges)."""
+    now = str(time.time_ns())
+    
+    def gauge(name, unit, points):
+        return {"name": name, "unit": unit, "gauge": {"dataPoints": [
+            dict({"timeUnixNano": now, "attributes": [{"key": k, "value": {"stringValue": v}} for k, v in attributes]},
+                 **({"asInt": str(value)} if isinstance(value, int) else {"asDouble": value}))
+            for value, attributes in points
+        ]}}
+    
+    otlp_metrics = [
+        gauge("oci_usage_reports.wall", "s", [(float(metrics["wall_seconds"]), [])]),
+        gauge("oci_usage_reports.phase.duration", "s",
+              [(float(entry["seconds"]), [("phase", name)]) for name, entry in sorted(metrics["phases"].items())])
+    ]
+    otlp_metrics += [gauge(f"oci_usage_reports.{name}", "By" if name.startswith("bytes_") else "1", [(value, [])])
+                     for name, value in sorted(metrics["counters"].items())]
+    return {"resourceMetrics": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": function_name}}]},
+        "scopeMetrics": [{"scope": {"name": "oci_usage_reports"}, "metrics": otlp_metrics}]
+    }]}
+
+
+def _export_metrics(metrics, cfg, function_name):
+    """
+    Optional metrics export: 'metrics_format' ('prometheus' or 'otlp') selects the format and 'metrics_url'
+    (e.g. a Pushgateway job URL or an OTLP/HTTP /v1/metrics endpoint) receives it as a POST.
+    Without a URL the rendered metrics are logged. Export errors never fail the invocation.
+    """
+    metrics_format = str(cfg.get('metrics_format') or '').strip().lower()
+    if not metrics_format:
+        return
+    if metrics_format not in METRICS_FORMATS:
+        logger.warning(f"Ignoring unknown 'metrics_format' '{metrics_format}'. Use one of: {', '.join(METRICS_FORMATS)}.")
+        return
+    if metrics_format == 'prometheus':
+        body, content_type = _prometheus_metrics(metrics, function_name), 'text/plain; version=0.0.4'
+    else:
+        body, content_type = json.dumps(_otlp_metrics(metrics, function_name)), 'application/json'
+    metrics_url = str(cfg.get('metrics_url') or '').strip()
+    if not metrics_url:
+        logger.info(f"Metrics ({metrics_format}):\n{body}")
+        return
+    # Imported here: only needed when metrics are exported, and it is slow to import
+    import urllib.request
+    try:
+        request = urllib.request.Request(metrics_url, data=body.encode('utf-8'), headers={'Content-Type': content_type}, method='POST')
+        with urllib.request.urlopen(request, timeout=METRICS_EXPORT_TIMEOUT) as export_response:
+            export_response.read()
+    except Exception as ex:
+        logger.warning(f"Could not export metrics to '{metrics_url}': {str(ex)}")
+
+
+def _respond(ctx, body, status_code, metrics, cfg):
+    """Attach the invocation metrics to the response, log them as one structured record and export them."""
+    body["metrics"] = metrics.as_dict()
+    logger.info(json.dumps({"event": "invocation_metrics", "function": FUNCTION_NAME, "status_code": status_code, **body["metrics"]}))
+    _export_metrics(body["metrics"], cfg, FUNCTION_NAME)
+    return response.Response(ctx, response_data=json.dumps(body), status_code=status_code)
+
+
+def _retry_after_seconds(headers):
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP date), or None."""
+    value = next((v for k, v in (headers or {}).items() if k.lower() == 'retry-after'), None)
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    import email.utils  # deferred: HTTP-date values are rare
+    try:
+        return max(0.0, (email.utils.parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_decision(ex):
+    """
+    Classify a failed request as (retryable, throttled, retry_after). Throttling (429, 503) and other
+    transient server errors, connection failures and broken or stalled response streams are retryable;
+    client errors (404, 412, ...) are not.
+    """
+    import oci.exceptions  # already loaded with the client
+    
+    status, headers = None, None
+    response_obj = getattr(ex, 'response', None)
+    if isinstance(ex, oci.exceptions.ServiceError):
+        status, headers = ex.status, ex.headers
+    elif response_obj is not None and hasattr(response_obj, 'status_code'):
+        # requests.HTTPError raised by raise_for_status() on a PAR request
+        status, headers = response_obj.status_code, response_obj.headers
+    else:
+        transient = (oci.exceptions.RequestException, oci.exceptions.ConnectTimeout, ConnectionError, TimeoutError)
+        requests = sys.modules.get('requests')  # only loaded when PAR uploads are used
+        if requests is not None:
+            transient += (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+        # A source download read chunk by chunk raises urllib3 errors (the SDK's vendored copy in older versions)
+        for module_name in ('urllib3.exceptions', 'oci._vendor.urllib3.exceptions'):
+            urllib3_exceptions = sys.modules.get(module_name)
+            if urllib3_exceptions is not None:
+                transient += (urllib3_exceptions.ProtocolError, urllib3_exceptions.ReadTimeoutError)
+        return isinstance(ex, transient), False, None
+    throttled = status in THROTTLE_STATUSES
+    return throttled or status in RETRYABLE_STATUSES, throttled, _retry_after_seconds(headers)
+
+
+class _TransferController:
+    """
+    Retry and concurrency controller shared by all Object Storage and PAR requests of an invocation.
+    
+    Throttled and transient failures are retried with full-jitter exponential backoff, or after the
+    Retry-After the service asks for (plus jitter, so throttled requests do not return in lockstep).
+    In-flight requests are limited with AIMD: a throttled response halves the number of requests in
+    flight (once per backoff window), each success grows the limit by 1/limit, up to max_concurrency,
+    so large copies and sweeps settle at the highest rate Object Storage accepts.
+    """
+    
+    def __init__(self, max_concurrency, attempts=DEFAULT_RETRY_ATTEMPTS, metrics=None, deadline=None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.attempts = max(1, attempts)
+        self.limit = float(self.max_concurrency)
+        self.min_limit = self.limit
+        self._metrics = metrics
+        self._deadline = deadline
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+    
+    @contextlib.contextmanager
+    def _slot(self):
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+    
+    def _on_success(self):
+        with self._condition:
+            if self.limit < self.max_concurrency:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+                self._condition.notify_all()
+    
+    def _on_throttle(self):
+        with self._condition:
+            now = time.monotonic()
+            # Requests that were already in flight when the service started throttling count only once
+            if now - self._last_decrease < RETRY_BASE_DELAY:
+                return
+            self._last_decrease = now
+            # Halve what was actually in flight (including the throttled request), not a nominal limit
+            self.limit = max(1.0, min(self.limit, self._in_flight + 1) / 2)
+            self.min_limit = min(self.min_limit, self.limit)
+        logger.warning(f"Throttled by Object Storage, concurrency limit reduced to {int(self.limit)}")
+    
+    def call(self, operation, description, attempts=None, gated=True, retry_decision=None):
+        """
+        Run operation() with retries and return its result. The operation must be safe to repeat, i.e.
+        re-open or re-read any body it sends. With gated=False the call does not wait for a slot (for
+        requests fed by a shared stream) but still reports throttling. retry_decision replaces
+        _retry_decision for operations that are only safe to repeat after some failures.
+        """
+        attempts = attempts or self.attempts
+        retry_decision = retry_decision or _retry_decision
+        for attempt in range(1, attempts + 1):
+            try:
+                with self._slot() if gated else contextlib.nullcontext():
+                    result = operation()
+            except Exception as ex:
+                retryable, throttled, retry_after = retry_decision(ex)
+                if throttled:
+                    self._on_throttle()
+                    if self._metrics is not None:
+                        self._metrics.add("throttled")
+                if not retryable or attempt == attempts:
+                    raise
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+                if retry_after is not None:
+                    delay += min(retry_after, RETRY_AFTER_MAX_DELAY)
+                if self._deadline is not None and time.monotonic() + delay >= self._deadline:
+                    raise
+                import oci.exceptions  # already loaded with the client
+                reason = f"{ex.status} {ex.code}" if isinstance(ex, oci.exceptions.ServiceError) else str(ex)
+                logger.warning(f"{description} failed (attempt {attempt}/{attempts}), retrying in {delay:.1f}s: {reason}")
+                if self._metrics is not None:
+                    self._metrics.add("retries")
+                time.sleep(delay)
+            else:
+                self._on_success()
+                return result
+
+
+def _new_controller(cfg, max_concurrency, metrics, deadline=None):
+    """Transfer controller with the 'retry_attempts' config (default 5, range 1-10)."""
+    try:
+        retry_attempts = int(cfg.get('retry_attempts', DEFAULT_RETRY_ATTEMPTS))
+    except (TypeError, ValueError):
+        retry_attempts = DEFAULT_RETRY_ATTEMPTS
+    retry_attempts = max(1, min(retry_attempts, 10))  # clamp 1-10
+    return _TransferController(max_concurrency, attempts=retry_attempts, metrics=metrics, deadline=deadline)
+
+
+def _seconds_until_deadline(ctx):
+    """Seconds left until the Fn invocation deadline (Fn-Deadline), or None when it is unknown."""
+    headers = ctx.Headers() if ctx is not None and hasattr(ctx, 'Headers') else None
+    # fdk's Deadline() makes one up (now + 30s) when the header is missing, e.g. for direct handler
+    # calls, so the deadline is only used when Fn actually sent it
+    if not headers or not any(str(k).lower() == 'fn-deadline' for k in headers):
+        return None
+    deadline = ctx.Deadline()
+    if not deadline:
+        return None
+    try:
+        # Fn may send RFC 3339 timestamps with nanoseconds; fromisoformat accepts at most microseconds
+        deadline = str(deadline).replace('Z', '+00:00')
+        if '.' in deadline:
+            head, tail = deadline.split('.', 1)
+            digits = len(tail) - len(tail.lstrip('0123456789'))
+            deadline = f"{head}.{tail[:min(digits, 6)]}{tail[digits:]}"
+        deadline_at = datetime.fromisoformat(deadline)
+    except ValueError:
+        logger.warning(f"Could not parse invocation deadline '{deadline}'")
+        return None
+    return (deadline_at - datetime.now(deadline_at.tzinfo)).total_seconds()
+
+
+def _sweep_deadline(ctx, cfg):
+    """Monotonic time at which a sweep stops listing, or None when the invocation has no known time limit."""
+    remaining = _seconds_until_deadline(ctx)
+    try:
+        time_budget = float(cfg['time_budget_seconds']) if cfg.get('time_budget_seconds') else None
+    except (TypeError, ValueError):
+        time_budget = None
+    if time_budget is not None:
+        remaining = time_budget if remaining is None else min(remaining, time_budget)
+    try:
+        deadline_margin = float(cfg.get('deadline_margin_seconds', DEFAULT_DEADLINE_MARGIN))
+    except (TypeError, ValueError):
+        deadline_margin = DEFAULT_DEADLINE_MARGIN
+    return time.monotonic() + remaining - max(0.0, deadline_margin) if remaining is not None else None
+
+
+def _delete_unprefixed_object(object_storage, namespace, bucket_name, object_name, metrics, controller):
+    try:
+        with metrics.timed("delete"):
+            controller.call(lambda: object_storage.delete_object(namespace_name=namespace, bucket_name=bucket_name, object_name=object_name),
+                            f"Delete of '{object_name}'")
+        logger.info(f"Deleted unauthorized file: {object_name}")
+        return {"object_name": object_name, "status": "deleted"}
+    except Exception as ex:
+        if getattr(ex, 'status', None) == 404:
+            # Already gone, e.g. deleted by the event-driven check in the meantime
+            return {"object_name": object_name, "status": "deleted"}
+        logger.error(f"Failed to delete file '{object_name}': {str(ex)}")
+        return {"object_name": object_name, "status": "error", "error": str(ex)}
+
+
+def _sweep_bucket(ctx, cfg, sweep, expected_prefix, metrics):
+    """
+    Reconcile a whole bucket: list it page by page (names only) and delete every object without the
+    expected secret prefix using a bounded pool of delete_object calls.
+    
+    Covers objects whose create events were dropped or delayed, or that existed before the event rule.
+    The sweep stops listing before the invocation deadline and returns 'next_start_after'; invoke again
+    with it as 'start_after' to continue. A page is checkpointed only after all of its deletes succeeded;
+    after a failed delete the checkpoint stays before that page, so a resumed sweep retries it. A listing
+    that fails after its retries ends the sweep with the pages finished so far and their checkpoint. The
+    response carries counts and at most SWEEP_SAMPLE_SIZE deleted and failed objects, so it stays within
+    the Functions response limit on buckets with many objects to delete.
+    """
+    with metrics.timed("auth"):
+        object_storage = _get_object_storage()
+    bucket_name = str(sweep.get('bucketName') or sweep.get('bucket_name') or cfg.get('bucket_name') or '').strip()
+    if not bucket_name:
+        raise ValueError("Sweep needs a bucket: pass 'bucketName' in the payload or set config key 'bucket_name'.")
+    start_after = sweep.get('start_after') or None
+    
+    try:
+        sweep_concurrency = int(cfg.get('sweep_concurrency', DEFAULT_SWEEP_CONCURRENCY))
+    except (TypeError, ValueError):
+        sweep_concurrency = DEFAULT_SWEEP_CONCURRENCY
+    sweep_concurrency = max(1, min(sweep_concurrency, 32))  # clamp 1-32
+    deadline = _sweep_deadline(ctx, cfg)
+    # Deletes plus the listing of the next page run at the same time
+    controller = _new_controller(cfg, sweep_concurrency + 1, metrics, deadline)
+    
+    namespace = str(sweep.get('namespace') or cfg.get('namespace') or '').strip()
+    if not namespace:
+        with metrics.timed("get_namespace"):
+            namespace = controller.call(object_storage.get_namespace, "Namespace lookup").data
+    
+    logger.info(f"Sweeping namespace '{namespace}', bucket '{bucket_name}' after '{start_after or ''}' with {sweep_concurrency} parallel deletes")
+    checked_count = 0
+    deleted_count = 0
+    deleted_sample = []
+    failed_count = 0
+    failed_sample = []
+    listing_error = None
+    checkpoint = start_after  # last name of the pages whose deletes all succeeded, in listing order
+    checkpoint_held = False
+    pending = None  # (futures, last name) of the page whose deletes are still running
+    next_start = None
+    completed = False
+    
+    def record(futures):
+        nonlocal deleted_count, failed_count
+        for future in futures:
+            result = future.result()
+            if result["status"] == "deleted":
+                deleted_count += 1
+                if len(deleted_sample) < SWEEP_SAMPLE_SIZE:
+                    deleted_sample.append(result["object_name"])
+            else:
+                failed_count += 1
+                if len(failed_sample) < SWEEP_SAMPLE_SIZE:
+                    failed_sample.append(result)
+    
+    def finish_page(page):
+        nonlocal checkpoint, checkpoint_held
+        failed_before = failed_count
+        record(page[0])
+        if failed_count > failed_before:
+            # Later pages are still swept, but a resumed sweep starts again before this page
+            checkpoint_held = True
+        elif not checkpoint_held:
+            checkpoint = page[1]
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=sweep_concurrency) as executor:
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning("Time budget exhausted, stopping sweep")
+                break
+            # The next page is listed while the deletes of the previous page are still running
+            kwargs = {"fields": 'name', "limit": SWEEP_PAGE_SIZE}
+            if next_start:
+                kwargs["start"] = next_start
+            elif start_after:
+                kwargs["start_after"] = start_after
+            try:
+                with metrics.timed("list"):
+                    listing = controller.call(lambda: object_storage.list_objects(namespace, bucket_name, **kwargs),
+                                              f"Listing of '{bucket_name}'").data
+            except Exception as ex:
+                # Pages already listed are finished and checkpointed below; the sweep resumes from there
+                logger.error(f"Listing of '{bucket_name}' failed, stopping sweep: {str(ex)}")
+                listing_error = ex
+                break
+            checked_count += len(listing.objects)
+            offenders = [o.name for o in listing.objects if not o.name.startswith(expected_prefix)]
+            futures = [executor.submit(_delete_unprefixed_object, object_storage, namespace, bucket_name, name, metrics, controller)
+                       for name in offenders]
+            if pending is not None:
+                finish_page(pending)
+            pending = (futures, listing.objects[-1].name if listing.objects else start_after)
+            next_start = listing.next_start_with
+            if not next_start:
+                completed = True
+                break
+        if pending is not None:
+            finish_page(pending)
+    
+    # null only when the sweep is done and every delete succeeded; "" restarts the sweep from the start
+    next_start_after = None if completed and not failed_count else (checkpoint or "")
+    metrics.add("objects_checked", checked_count)
+    metrics.add("objects_deleted", deleted_count)
+    metrics.add("objects_failed", failed_count)
+    if completed:
+        stopped = "completed"
+    elif listing_error is not None:
+        stopped = "stopped after a listing error"
+    else:
+        stopped = "stopped at time budget"
+    message = f"Sweep {stopped}: checked {checked_count} object(s), deleted {deleted_count}"
+    if failed_count:
+        message += f", {failed_count} deletion(s) failed"
+    if failed_count or listing_error is not None:
+        logger.error(message)
+    else:
+        logger.info(message)
+    response_body = {
+        "message": message,
+        "status": "sweep_completed" if completed and not failed_count else "sweep_partial",
+        "namespace": namespace,
+        "bucket": bucket_name,
+        "objects_checked": checked_count,
+        "objects_deleted": deleted_count,
+        "objects_failed": failed_count,
+        "deleted": deleted_sample,
+        "failed": failed_sample,
+        "samples_truncated": deleted_count > len(deleted_sample) or failed_count > len(failed_sample),
+        "next_start_after": next_start_after
+    }
+    if listing_error is not None:
+        response_body["error"] = f"Listing failed: {str(listing_error)}"
+    return _respond(
+        ctx,
+        response_body,
+        500 if failed_count or listing_error is not None else 200,
+        metrics,
+        cfg
+    )
+
+
+def _batch_events(payload):
+    """
+    Events of a batch payload, or None for a single event.
+    
+    A batch is either a JSON array of CloudEvents or a queue-style {"messages": [{"content": ...}]} payload,
+    where each message content is an event object, its JSON string or its base64-encoded JSON.
+    """
+    if isinstance(payload, list):
+        return payload
+    if not isinstance(payload, dict) or not isinstance(payload.get('messages'), list):
+        return None
+    events = []
+    for message in payload['messages']:
+        content = message.get('content') if isinstance(message, dict) else message
+        if isinstance(content, str):
+            try:
+                content = json.loads(content)
+            except ValueError:
+                try:
+                    content = json.loads(base64.b64decode(content, validate=True))
+                except ValueError:
+                    content = None
+        events.append(content)
+    return events
+
+
+def _event_object(event):
+    """(namespace, bucket, object name) of an Object Storage event, with '' for missing values."""
+    if not isinstance(event, dict):
+        return '', '', ''
+    event_data_obj = event.get('data') or {}
+    additional_details = event_data_obj.get('additionalDetails') or {}
+    return (
+        str(additional_details.get('namespace') or '').strip(),
+        str(additional_details.get('bucketName') or '').strip(),
+        str(event_data_obj.get('resourceName') or '').strip()
+    )
+
+
+def _check_event_batch(ctx, cfg, events, expected_prefix, metrics):
+    """
+    Validate a batch of object events in one pass and delete the offenders concurrently.
+    
+    The client is only created when at least one object must be deleted; duplicate events for the same
+    object (e.g. create followed by update) lead to a single delete.
+    """
+    try:
+        delete_concurrency = int(cfg.get('sweep_concurrency', DEFAULT_SWEEP_CONCURRENCY))
+    except (TypeError, ValueError):
+        delete_concurrency = DEFAULT_SWEEP_CONCURRENCY
+    delete_concurrency = max(1, min(delete_concurrency, 32))  # clamp 1-32
+    
+    results = []
+    to_delete = {}
+    for event in events:
+        namespace, bucket_name, object_name = _event_object(event)
+        result = {"object_name": object_name, "namespace": namespace, "bucket": bucket_name}
+        if not object_name or not namespace or not bucket_name:
+            result.update(status="invalid_event", error="Event has no resourceName, namespace or bucketName")
+        elif object_name.startswith(expected_prefix):
+            result["status"] = "valid"
+        else:
+            logger.warning(f"SECURITY ALERT: Object '{object_name}' does not have correct secret prefix!")
+            to_delete.setdefault((namespace, bucket_name, object_name), []).append(result)
+        results.append(result)
+    
+    if to_delete:
+        with metrics.timed("auth"):
+            object_storage = _get_object_storage()
+        controller = _new_controller(cfg, min(delete_concurrency, len(to_delete)), metrics)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(delete_concurrency, len(to_delete))) as executor:
+            futures = {executor.submit(_delete_unprefixed_object, object_storage, *key, metrics, controller): key for key in to_delete}
+            for future in concurrent.futures.as_completed(futures):
+                outcome = future.result()
+                for result in to_delete[futures[future]]:
+                    result["status"] = outcome["status"]
+                    if "error" in outcome:
+                        result["error"] = outcome["error"]
+    
+    counts = {status: sum(1 for r in results if r["status"] == status) for status in ('valid', 'deleted', 'error', 'invalid_event')}
+    message = (f"Batch of {len(results)} event(s): {counts['valid']} valid, {counts['deleted']} deleted, "
+               f"{counts['error']} deletion error(s), {counts['invalid_event']} invalid event(s)")
+    logger.info(message)
+    metrics.add("events", len(results))
+    metrics.add("objects_checked", len(results) - counts['invalid_event'])
+    metrics.add("objects_valid", counts['valid'])
+    metrics.add("objects_deleted", counts['deleted'])
+    metrics.add("objects_failed", counts['error'])
+    return _respond(
+        ctx,
+        {
+            "message": message,
+            "status": "batch",
+            "files_valid": counts['valid'],
+            "files_deleted": counts['deleted'],
+            "files_failed": counts['error'],
+            "events_invalid": counts['invalid_event'],
+            "results": results
+        },
+        500 if counts['error'] else 200,
+        metrics,
+        cfg
+    )
+
+
 def handler(ctx, data: io.BytesIO = None):
     """
     Function to validate uploaded files in OCI Object Storage.
@@ -15,7 +668,12 @@ def handler(ctx, data: io.BytesIO = None):
     This function is triggered by bucket write events and checks if uploaded files
     have the correct secret prefix (base64-encoded secret followed by underscore).
     Files without the correct prefix are logged and deleted.
+    
+    A JSON array of events (or a queue-style {"messages": [...]} payload) is validated as one batch,
+    and a payload of {"sweep": {"bucketName": ..., "start_after": ...}} checks the whole bucket instead.
     """
+    metrics = _Metrics(counters=("events", "objects_checked", "objects_valid", "objects_deleted", "objects_failed", "retries", "throttled"))
+    cfg = {}
     try:
         cfg = dict(ctx.Config()) if ctx is not None else {}
         
@@ -30,13 +688,15 @@ def handler(ctx, data: io.BytesIO = None):
         # Parse the event data
         if data is None:
             logger.error("No event data received")
-            return response.Response(
+            return _respond(
                 ctx,
-                response_data=json.dumps({
+                {
                     "message": "No event data received",
                     "status": "error"
-                }),
-                status_code=400
+                },
+                400,
+                metrics,
+                cfg
             )
         
         # Read and decode event data
@@ -46,13 +706,15 @@ def handler(ctx, data: io.BytesIO = None):
             
             if len(raw_data) == 0:
                 logger.error("Empty event data received")
-                return response.Response(
+                return _respond(
                     ctx,
-                    response_data=json.dumps({
+                    {
                         "message": "Empty event data received",
                         "status": "error"
-                    }),
-                    status_code=400
+                    },
+                    400,
+                    metrics,
+                    cfg
                 )
             
             # Try to decode as UTF-8
@@ -61,49 +723,69 @@ def handler(ctx, data: io.BytesIO = None):
                 logger.info(f"Decoded event data (first 500 chars): {decoded_data[:500]}")
             except UnicodeDecodeError as e:
                 logger.error(f"Failed to decode event data as UTF-8: {str(e)}")
-                return response.Response(
+                return _respond(
                     ctx,
-                    response_data=json.dumps({
+                    {
                         "message": "Failed to decode event data",
                         "error": str(e),
                         "status": "error"
-                    }),
-                    status_code=400
+                    },
+                    400,
+                    metrics,
+                    cfg
                 )
             
             # Parse JSON
             try:
                 event_data = json.loads(decoded_data)
-                logger.info(f"Parsed event data keys: {list(event_data.keys())}")
-                if 'data' in event_data:
+                batch_events = _batch_events(event_data)
+                if batch_events is not None:
+                    logger.info(f"Parsed batch of {len(batch_events)} event(s)")
+                else:
+                    logger.info(f"Parsed event data keys: {list(event_data.keys())}")
+                if batch_events is None and 'data' in event_data:
                     logger.info(f"Event data.data keys: {list(event_data['data'].keys())}")
                     if 'additionalDetails' in event_data.get('data', {}):
                         logger.info(f"Event data.data.additionalDetails keys: {list(event_data['data']['additionalDetails'].keys())}")
             except json.JSONDecodeError as e:
                 logger.error(f"Failed to parse JSON: {str(e)}")
                 logger.error(f"Data content: {decoded_data[:1000]}")
-                return response.Response(
+                return _respond(
                     ctx,
-                    response_data=json.dumps({
+                    {
                         "message": "Invalid JSON in event data",
                         "error": str(e),
                         "data_preview": decoded_data[:200],
                         "status": "error"
-                    }),
-                    status_code=400
+                    },
+                    400,
+                    metrics,
+                    cfg
                 )
         except Exception as parse_ex:
             logger.error(f"Error reading/parsing event data: {str(parse_ex)}", exc_info=True)
-            return response.Response(
+            return _respond(
                 ctx,
-                response_data=json.dumps({
+                {
                     "message": "Error parsing event data",
                     "error": str(parse_ex),
                     "status": "error"
-                }),
-                status_code=400
+                },
+                400,
+                metrics,
+                cfg
             )
         
+        # Batch mode: validate many events in one invocation with concurrent deletes
+        if batch_events is not None:
+            secret_b64 = base64.b64encode(secret.encode('utf-8')).decode('utf-8')
+            return _check_event_batch(ctx, cfg, batch_events, f"{secret_b64}_", metrics)
+        
+        # Sweep mode: reconcile the whole bucket instead of checking the single object of an event
+        if isinstance(event_data.get('sweep'), dict):
+            secret_b64 = base64.b64encode(secret.encode('utf-8')).decode('utf-8')
+            return _sweep_bucket(ctx, cfg, event_data['sweep'], f"{secret_b64}_", metrics)
+        
         # Extract object information from event
         # OCI Object Storage events structure:
         # {
@@ -127,48 +809,46 @@ def handler(ctx, data: io.BytesIO = None):
         
         if not object_name:
             logger.error("No object name (resourceName) found in event data")
-            return response.Response(
+            return _respond(
                 ctx,
-                response_data=json.dumps({
+                {
                     "message": "No object name found in event data",
                     "status": "error"
-                }),
-                status_code=400
+                },
+                400,
+                metrics,
+                cfg
             )
         
         if not namespace:
             logger.error("No namespace found in event data.additionalDetails")
-            return response.Response(
+            return _respond(
                 ctx,
-                response_data=json.dumps({
+                {
                     "message": "No namespace found in event data",
                     "status": "error"
-                }),
-                status_code=400
+                },
+                400,
+                metrics,
+                cfg
             )
         
         if not bucket_name:
             logger.error("No bucketName found in event data.additionalDetails")
-            return response.Response(
+            return _respond(
                 ctx,
-                response_data=json.dumps({
+                {
                     "message": "No bucketName found in event data",
                     "status": "error"
-                }),
-                status_code=400
+                },
+                400,
+                metrics,
+                cfg
             )
         
         logger.info(f"Extracted from event: namespace={namespace}, bucket={bucket_name}, object={object_name}")
-        
-        # Initialize OCI Object Storage client (needed for deletion)
-        if os.path.exists('/config'):
-            logger.info("Found /config file, using OCI CLI authentication")
-            config = oci.config.from_file('/config')
-            object_storage = oci.object_storage.ObjectStorageClient(config)
-        else:
-            logger.info("No /config file found, using Resource Principal authentication")
-            Signer = oci.auth.signers.get_resource_principals_signer()
-            object_storage = oci.object_storage.ObjectStorageClient(config={}, signer=Signer)
+        metrics.add("events")
+        metrics.add("objects_checked")
         
         # Calculate expected secret prefix
         secret_b64 = base64.b64encode(secret.encode('utf-8')).decode('utf-8')
@@ -185,25 +865,27 @@ def handler(ctx, data: io.BytesIO = None):
             # Validate all required parameters before attempting deletion
             if not namespace or not namespace.strip():
                 logger.error(f"Cannot delete file - namespace is empty or None: '{namespace}'")
-                return response.Response(
+                return _respond(
                     ctx,
-                    response_data=json.dumps({
+                    {
                         "message": "File validation failed but cannot delete - namespace is empty",
                         "status": "validation_failed",
                         "object_name": object_name,
                         "namespace": str(namespace) if namespace else "None",
                         "bucket": bucket_name or "missing"
-                    }),
-                    status_code=200
+                    },
+                    200,
+                    metrics,
+                    cfg
                 )
             
             if not bucket_name or not bucket_name.strip():
                 logger.error(f"Cannot delete file - bucket name is empty or None: '{bucket_name}'")
                 logger.error(f"Event data keys: {list(event_data.keys())}")
                 logger.error(f"Event data.data keys: {list(event_data_obj.keys())}")
-                return response.Response(
+                return _respond(
                     ctx,
-                    response_data=json.dumps({
+                    {
                         "message": "File validation failed but cannot delete - bucket is empty",
                         "status": "validation_failed",
                         "object_name": object_name,
@@ -213,82 +895,101 @@ def handler(ctx, data: io.BytesIO = None):
                             "top_level_keys": list(event_data.keys()),
                             "data_keys": list(event_data_obj.keys())
                         }
-                    }),
-                    status_code=200
+                    },
+                    200,
+                    metrics,
+                    cfg
                 )
             
             if not object_name or not object_name.strip():
                 logger.error(f"Cannot delete file - object name is empty or None: '{object_name}'")
-                return response.Response(
+                return _respond(
                     ctx,
-                    response_data=json.dumps({
+                    {
                         "message": "File validation failed but cannot delete - object name is empty",
                         "status": "validation_failed",
                         "object_name": str(object_name) if object_name else "None",
                         "namespace": namespace,
                         "bucket": bucket_name
-                    }),
-                    status_code=200
+                    },
+                    200,
+                    metrics,
+                    cfg
                 )
             
             # Delete the unauthorized file
             try:
+                # Initialize OCI Object Storage client (needed for deletion); cached across warm invocations
+                with metrics.timed("auth"):
+                    object_storage = _get_object_storage()
                 logger.info(f"Deleting unauthorized file: namespace='{namespace}', bucket='{bucket_name}', object='{object_name}'")
-                object_storage.delete_object(
-                    namespace_name=namespace.strip(),
-                    bucket_name=bucket_name.strip(),
-                    object_name=object_name.strip()
-                )
+                with metrics.timed("delete"):
+                    _new_controller(cfg, 1, metrics).call(lambda: object_storage.delete_object(
+                        namespace_name=namespace.strip(),
+                        bucket_name=bucket_name.strip(),
+                        object_name=object_name.strip()
+                    ), f"Delete of '{object_name}'")
                 logger.info(f"Successfully deleted unauthorized file: {object_name}")
+                metrics.add("objects_deleted")
                 
-                return response.Response(
+                return _respond(
                     ctx,
-                    response_data=json.dumps({
+                    {
                         "message": "File deleted - invalid secret prefix",
                         "status": "deleted",
                         "object_name": object_name,
                         "namespace": namespace,
                         "bucket": bucket_name
-                    }),
-                    status_code=200
+                    },
+                    200,
+                    metrics,
+                    cfg
                 )
             except Exception as delete_ex:
                 logger.error(f"Failed to delete file: {str(delete_ex)}", exc_info=True)
-                return response.Response(
+                metrics.add("objects_failed")
+                return _respond(
                     ctx,
-                    response_data=json.dumps({
+                    {
                         "message": "File validation failed but deletion error occurred",
                         "status": "error",
                         "object_name": object_name,
                         "namespace": namespace,
                         "bucket": bucket_name,
                         "error": str(delete_ex)
-                    }),
-                    status_code=500
+                    },
+                    500,
+                    metrics,
+                    cfg
                 )
         else:
             logger.info(f"File '{object_name}' has valid secret prefix - allowing")
-            return response.Response(
+            metrics.add("objects_valid")
+            return _respond(
                 ctx,
-                response_data=json.dumps({
+                {
                     "message": "File validated successfully",
                     "status": "valid",
                     "object_name": object_name,
                     "namespace": namespace,
                     "bucket": bucket_name
-                }),
-                status_code=200
+                },
+                200,
+                metrics,
+                cfg
             )
         
     except (Exception, ValueError) as ex:
         error_msg = f'Error processing file validation: {str(ex)}'
         logger.error(error_msg, exc_info=True)
-        return response.Response(
+        return _respond(
             ctx,
-            response_data=json.dumps({
+            {
                 "message": "Error processing file validation",
                 "error": str(ex),
                 "status": "error"
-            }),
-            status_code=500
+            },
+            500,
+            metrics,
+            cfg
         )